@@ -0,0 +1,466 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from database import SERVICE_HOST, Database, ServiceClient, hash_password
+from engine import TRAFFIC_BACKENDS, Simulation
+from quality import QUALITY_LEVELS, QUALITY_MODE
+
+BENCHMARK_PATH = "benchmark.json"
+BENCHMARK_SUITES = ["sim", "render", "db", "service"]
+BENCHMARK_SEED = 1
+BENCHMARK_REPEAT = 3
+BENCHMARK_THRESHOLD = 0.1
+SIM_ENEMY_COUNTS = [8, 32, 128, 512]
+SIM_TICKS = 3000
+RENDER_WARMUP_FRAMES = 30
+RENDER_FRAMES = 300
+DB_SIZES = [1000, 10000, 100000]
+DB_SCORE_DISTRIBUTIONS = ["uniform", "skewed"]
+DB_SCORE_MAX = 100000
+DB_SKEWED_MEAN_SCORE = 300
+DB_ROWS_PER_USER = 10
+DB_BATCH_SIZE = 10000
+DB_OPERATIONS = 1000
+DB_LOGIN_OPERATIONS = 20
+DB_PASSWORD = "benchmark"
+SERVICE_CLIENTS = 32
+SERVICE_WRITES = 100
+SERVICE_START_TIMEOUT = 10
+DRAW_FUNCTIONS = [
+    "glDrawArrays",
+    "glDrawElements",
+    "glDrawArraysInstanced",
+    "glDrawElementsInstanced",
+    "glMultiDrawArrays",
+    "glMultiDrawElements"
+]
+
+
+def parse_values(text):
+    return [int(float(value)) for value in text.split(",") if value.strip()]
+
+
+def result(value, unit, higher_is_better=True, **details):
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better, **details}
+
+
+def repeat_measure(repeat, measure):
+    return [measure() for _ in range(repeat)]
+
+
+def bench_simulation(enemy_counts, ticks, repeat, seed):
+    results = {}
+    backends = sorted(TRAFFIC_BACKENDS)
+    for backend in backends:
+        for enemy_count in enemy_counts:
+            try:
+                simulation = Simulation(seed, enemy_count=enemy_count, traffic=backend)
+            except RuntimeError as e:
+                print(f"Пропуск {backend}: {e}")
+                break
+
+            def measure():
+                simulation.setup(seed)
+                started = time.perf_counter()
+                for _ in range(ticks):
+                    simulation.tick()
+                return ticks / (time.perf_counter() - started)
+
+            rates = repeat_measure(repeat, measure)
+            key = f"sim.{backend}.{enemy_count}"
+            results[key] = result(max(rates), "тиков/с", runs=rates)
+            print(f"{key}: {max(rates):.0f} тиков/с")
+    return results
+
+
+class DrawCallCounter:
+    def __init__(self):
+        self.count = 0
+        self.patched = []
+
+    def wrap(self, function):
+        def counted(*args):
+            self.count += 1
+            return function(*args)
+        return counted
+
+    def __enter__(self):
+        import pyglet.gl
+        originals = {name: getattr(pyglet.gl, name) for name in DRAW_FUNCTIONS if hasattr(pyglet.gl, name)}
+        wrappers = {name: self.wrap(function) for name, function in originals.items()}
+        for module in list(sys.modules.values()):
+            if module is None or not getattr(module, "__name__", "").startswith(("pyglet", "arcade")):
+                continue
+            for name, function in originals.items():
+                if getattr(module, name, None) is function:
+                    setattr(module, name, wrappers[name])
+                    self.patched.append((module, name, function))
+        return self
+
+    def __exit__(self, *exc):
+        for module, name, function in self.patched:
+            setattr(module, name, function)
+        self.patched = []
+
+
+def measure_frames(window, view, frames, step=None):
+    from simulate import dodge_driver
+
+    rng = random.Random(BENCHMARK_SEED)
+    window.show_view(view)
+    times = []
+    with DrawCallCounter() as counter:
+        for frame in range(RENDER_WARMUP_FRAMES + frames):
+            if step is not None:
+                step(rng, dodge_driver)
+            if frame == RENDER_WARMUP_FRAMES:
+                counter.count = 0
+            started = time.perf_counter()
+            view.on_draw()
+            window.ctx.finish()
+            if frame >= RENDER_WARMUP_FRAMES:
+                times.append((time.perf_counter() - started) * 1000)
+            window.flip()
+    return times, counter.count / frames
+
+
+def frame_results(key, times, draw_calls):
+    ordered = sorted(times)
+    p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    median = statistics.median(times)
+    print(f"{key}: {median:.3f} мс (p95 {p95:.3f}), вызовов отрисовки за кадр: {draw_calls:.1f}")
+    return {
+        f"{key}.frame_ms": result(median, "мс", False, p95=p95),
+        f"{key}.draw_calls": result(draw_calls, "вызовов/кадр", False)
+    }
+
+
+def bench_render(frames, seed):
+    os.environ.setdefault("ARCADE_HEADLESS", "1")
+    try:
+        import main
+    except Exception as e:
+        print(f"Пропуск отрисовки: не удалось создать контекст OpenGL: {e}")
+        return {}
+
+    results = {}
+    started = time.perf_counter()
+    window = main.GameWindow()
+    try:
+        registration = window.registration_view
+        registration.player_name = "benchmark"
+        registration.leaderboard = [{"name": f"player{i}", "score": 10000 - i * 100, "id": i}
+                                    for i in range(5)]
+        window.show_view(registration)
+        registration.on_draw()
+        window.ctx.finish()
+        startup = (time.perf_counter() - started) * 1000
+        results["render.startup_ms"] = result(startup, "мс", False)
+        print(f"render.startup_ms: {startup:.1f} мс до первого кадра регистрации")
+        times, draw_calls = measure_frames(window, registration, frames)
+        results.update(frame_results("render.registration", times, draw_calls))
+
+        game = window.game_view
+        simulation = game.simulation
+
+        def step(rng, driver):
+            if simulation.game_over:
+                game.setup()
+            driver(simulation, rng)
+            simulation.tick()
+
+        for mode in ["batched", "immediate"]:
+            for level in reversed(QUALITY_LEVELS):
+                main.quality.set_mode(level)
+                game.render_mode = mode
+                game.replay = (seed, 0, [], main.TRAFFIC_BACKEND)
+                game.setup()
+                times, draw_calls = measure_frames(window, game, frames, step)
+                results.update(frame_results(f"render.game.{mode}.{level}", times, draw_calls))
+        main.quality.set_mode(QUALITY_MODE)
+    finally:
+        window.close()
+    return results
+
+
+def random_score(rng, distribution):
+    if distribution == "skewed":
+        return min(int(rng.expovariate(1 / DB_SKEWED_MEAN_SCORE)), DB_SCORE_MAX)
+    return rng.randint(0, DB_SCORE_MAX)
+
+
+def build_database(path, rows, seed, distribution="uniform"):
+    rng = random.Random(seed)
+    users = max(rows // DB_ROWS_PER_USER, 1)
+    database = Database(path)
+    conn = database.connect()
+    password_hash = hash_password(DB_PASSWORD)
+    with conn:
+        conn.executemany(Database.INSERT_USER, ((f"player{i}", password_hash) for i in range(users)))
+    now = int(time.time())
+    for start in range(0, rows, DB_BATCH_SIZE):
+        batch = [(rng.randint(1, users), random_score(rng, distribution), now - rng.randint(0, 86400 * 365), None)
+                 for _ in range(min(DB_BATCH_SIZE, rows - start))]
+        with conn:
+            conn.executemany(Database.INSERT_SCORE, batch)
+    return database, users
+
+
+def bench_database(sizes, operations, repeat, seed, distributions=DB_SCORE_DISTRIBUTIONS):
+    results = {}
+    directory = tempfile.mkdtemp(prefix="carsgame-bench-")
+    try:
+        for rows, distribution in itertools.product(sizes, distributions):
+            started = time.perf_counter()
+            database, users = build_database(os.path.join(directory, f"bench-{rows}-{distribution}.db"), rows,
+                                              seed, distribution)
+            print(f"База на {rows} записей ({distribution}) построена за {time.perf_counter() - started:.1f}с")
+            suffix = "" if distribution == "uniform" else f".{distribution}"
+            rng = random.Random(seed)
+
+            def login():
+                names = [rng.randrange(users) for _ in range(DB_LOGIN_OPERATIONS)]
+                database.credentials.clear()
+                started = time.perf_counter()
+                for i in names:
+                    database.register_or_login_user(f"player{i}", DB_PASSWORD)
+                return DB_LOGIN_OPERATIONS / (time.perf_counter() - started)
+
+            def insert():
+                ids = [rng.randint(1, users) for _ in range(operations)]
+                started = time.perf_counter()
+                for id in ids:
+                    database.save_record(id, random_score(rng, distribution))
+                return operations / (time.perf_counter() - started)
+
+            def top_players():
+                started = time.perf_counter()
+                for _ in range(operations):
+                    database.get_top_players(5)
+                return operations / (time.perf_counter() - started)
+
+            def page():
+                cursors = [(random_score(rng, distribution), rng.randint(1, users)) for _ in range(operations)]
+                started = time.perf_counter()
+                for after in cursors:
+                    database.get_leaderboard("all", after=after)
+                return operations / (time.perf_counter() - started)
+
+            def rank():
+                ids = [rng.randint(1, users) for _ in range(operations)]
+                started = time.perf_counter()
+                for id in ids:
+                    database.get_rank(id)
+                return operations / (time.perf_counter() - started)
+
+            try:
+                for name, measure in [("login", login), ("insert", insert), ("top", top_players),
+                                      ("page", page), ("rank", rank)]:
+                    rates = repeat_measure(repeat, measure)
+                    key = f"db.{name}.{rows}{suffix}"
+                    results[key] = result(max(rates), "операций/с", runs=rates)
+                    print(f"{key}: {max(rates):.0f} операций/с")
+            finally:
+                database.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def run_clients(databases, writes, seed):
+    failures = [0] * len(databases)
+
+    def client(index):
+        rng = random.Random(seed + index)
+        for _ in range(writes):
+            if not databases[index].save_record(index + 1, rng.randint(0, 100000)):
+                failures[index] += 1
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(len(databases))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return (len(databases) * writes - sum(failures)) / elapsed, sum(failures)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((SERVICE_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_service(path, port):
+    process = subprocess.Popen([sys.executable, "score_service.py", "--db", path, "--port", str(port)],
+                               cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL)
+    deadline = time.perf_counter() + SERVICE_START_TIMEOUT
+    while time.perf_counter() < deadline:
+        try:
+            socket.create_connection((SERVICE_HOST, port), 1).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("сервис рекордов не запустился")
+
+
+def bench_service(clients, writes, repeat, seed):
+    results = {}
+    directory = tempfile.mkdtemp(prefix="carsgame-bench-")
+    try:
+        path = os.path.join(directory, "service.db")
+        build_database(path, clients * DB_ROWS_PER_USER, seed)[0].close()
+
+        def direct():
+            databases = [Database(path) for _ in range(clients)]
+            try:
+                return run_clients(databases, writes, seed)
+            finally:
+                for database in databases:
+                    database.close()
+
+        port = free_port()
+        process = start_service(path, port)
+
+        def service():
+            databases = [Database(path, service=(SERVICE_HOST, port)) for _ in range(clients)]
+            try:
+                return run_clients(databases, writes, seed)
+            finally:
+                for database in databases:
+                    database.close()
+
+        try:
+            for name, measure in [("direct", direct), ("batched", service)]:
+                runs = repeat_measure(repeat, measure)
+                rates = [rate for rate, _ in runs]
+                failures = sum(failed for _, failed in runs)
+                key = f"service.{name}.{clients}"
+                results[f"{key}.writes"] = result(max(rates), "записей/с", runs=rates)
+                results[f"{key}.failures"] = result(failures, "записей", False)
+                print(f"{key}: {max(rates):.0f} записей/с, ошибок записи: {failures}")
+
+            client = ServiceClient((SERVICE_HOST, port))
+            try:
+                stats = client.call("stats")
+            finally:
+                client.close()
+            batch_size = stats["saved"] / max(stats["batches"], 1)
+            results[f"service.batched.{clients}.batch_size"] = result(batch_size, "записей/транзакцию")
+            print(f"service.batched.{clients}: {stats['batches']} транзакций, {batch_size:.1f} записей в каждой")
+        finally:
+            process.terminate()
+            process.wait()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def environment():
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "time": int(time.time())
+    }
+    for name in ["arcade", "numpy"]:
+        try:
+            info[name] = __import__(name).__version__
+        except ImportError:
+            info[name] = None
+    return info
+
+
+def compare(previous, current, threshold):
+    regressions = []
+    for key, entry in current.items():
+        baseline = previous.get(key)
+        if baseline is None or not baseline["value"]:
+            continue
+        change = (entry["value"] - baseline["value"]) / baseline["value"]
+        if not entry["higher_is_better"]:
+            change = -change
+        marker = ""
+        if change < -threshold:
+            regressions.append(key)
+            marker = "  <- регрессия"
+        print(f"{key:<36}{baseline['value']:>14.3f}{entry['value']:>14.3f}{change:>+9.1%}{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воспроизводимые замеры производительности Traffic Racer Lite")
+    parser.add_argument("--suite", type=lambda text: text.split(","), default=BENCHMARK_SUITES,
+                        help="наборы замеров через запятую: sim, render, db, service")
+    parser.add_argument("--enemies", type=parse_values, default=SIM_ENEMY_COUNTS,
+                        help="количество машин трафика через запятую")
+    parser.add_argument("--ticks", type=int, default=SIM_TICKS, help="тиков в одном замере симуляции")
+    parser.add_argument("--frames", type=int, default=RENDER_FRAMES, help="кадров в одном замере отрисовки")
+    parser.add_argument("--db-sizes", type=parse_values, default=DB_SIZES,
+                        help="размеры синтетических баз через запятую, например 1e3,1e5,1e7")
+    parser.add_argument("--scores", type=lambda text: text.split(","), default=DB_SCORE_DISTRIBUTIONS,
+                        help="распределения очков в синтетических базах через запятую: uniform, skewed")
+    parser.add_argument("--operations", type=int, default=DB_OPERATIONS, help="операций в одном замере базы")
+    parser.add_argument("--clients", type=int, default=SERVICE_CLIENTS,
+                        help="одновременных клиентов в замере сервиса рекордов")
+    parser.add_argument("--writes", type=int, default=SERVICE_WRITES, help="рекордов от каждого клиента")
+    parser.add_argument("--repeat", type=int, default=BENCHMARK_REPEAT, help="повторов каждого замера")
+    parser.add_argument("--seed", type=int, default=BENCHMARK_SEED, help="сид синтетических данных")
+    parser.add_argument("--output", default=BENCHMARK_PATH, help="файл JSON с результатами")
+    parser.add_argument("--compare", metavar="FILE", help="сравнить с результатами прошлого запуска")
+    parser.add_argument("--threshold", type=float, default=BENCHMARK_THRESHOLD,
+                        help="допустимое ухудшение при сравнении, доля")
+    args = parser.parse_args()
+    unknown = set(args.suite) - set(BENCHMARK_SUITES)
+    if unknown:
+        parser.error(f"неизвестные наборы: {', '.join(sorted(unknown))}")
+    unknown = set(args.scores) - set(DB_SCORE_DISTRIBUTIONS)
+    if unknown:
+        parser.error(f"неизвестные распределения: {', '.join(sorted(unknown))}")
+    if min(args.repeat, args.ticks, args.frames, args.operations, args.clients, args.writes) < 1:
+        parser.error("--repeat, --ticks, --frames, --operations, --clients и --writes должны быть больше нуля")
+
+    results = {}
+    if "sim" in args.suite:
+        results.update(bench_simulation(args.enemies, args.ticks, args.repeat, args.seed))
+    if "render" in args.suite:
+        results.update(bench_render(args.frames, args.seed))
+    if "db" in args.suite:
+        results.update(bench_database(args.db_sizes, args.operations, args.repeat, args.seed, args.scores))
+    if "service" in args.suite:
+        results.update(bench_service(args.clients, args.writes, args.repeat, args.seed))
+
+    report = {"environment": environment(), "settings": vars(args), "results": results}
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            previous = json.load(file)["results"]
+        print(f"{'замер':<36}{'было':>14}{'стало':>14}{'изм.':>9}")
+        regressions = compare(previous, results, args.threshold)
+        if regressions:
+            parser.exit(1, f"Регрессий: {len(regressions)} (порог {args.threshold:.0%})\n")
+        print("Регрессий нет")
+
+
+if __name__ == "__main__":
+    main()
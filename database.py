@@ -0,0 +1,790 @@
+import base64
+import datetime
+import hashlib
+import heapq
+import hmac
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+
+DATABASE_PATH = "carsgame.db"
+SCORE_SAVE_ATTEMPTS = 5
+SCORE_SAVE_BACKOFF = 0.25
+LEADERBOARD_CACHE_SIZE = 100
+LEADERBOARDS = ["day", "week", "all"]
+LEADERBOARD_PAGE_SIZE = 5
+RANK_BUCKET_SIZE = 100
+SCORE_MAX = 2 ** 63 - 1
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 47800
+SERVICE_TIMEOUT = 10
+PASSWORD_SALT_SIZE = 16
+PASSWORD_HASH_SIZE = 32
+PASSWORD_SCRYPT_N = 2 ** 14
+PASSWORD_SCRYPT_R = 8
+PASSWORD_SCRYPT_P = 1
+PASSWORD_PBKDF2_ITERATIONS = 600000
+
+
+def hash_password(password, salt=None):
+    if salt is None:
+        salt = os.urandom(PASSWORD_SALT_SIZE)
+    if hasattr(hashlib, "scrypt"):
+        digest = hashlib.scrypt(password.encode(), salt=salt, n=PASSWORD_SCRYPT_N, r=PASSWORD_SCRYPT_R,
+                                p=PASSWORD_SCRYPT_P, maxmem=256 * PASSWORD_SCRYPT_N * PASSWORD_SCRYPT_R,
+                                dklen=PASSWORD_HASH_SIZE)
+        return f"scrypt${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}${salt.hex()}${digest.hex()}"
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, PASSWORD_PBKDF2_ITERATIONS,
+                                 PASSWORD_HASH_SIZE)
+    return f"pbkdf2_sha256${PASSWORD_PBKDF2_ITERATIONS}${salt.hex()}${digest.hex()}"
+
+
+def leaderboard_period(board, now=None):
+    if board == "all":
+        return "all"
+    day = datetime.date.fromtimestamp(time.time() if now is None else now)
+    if board == "week":
+        day -= datetime.timedelta(days=day.weekday())
+    return f"{board}:{day.isoformat()}"
+
+
+def verify_password(password, stored):
+    fields = str(stored).split("$")
+    try:
+        if fields[0] == "scrypt" and len(fields) == 6:
+            n, r, p = int(fields[1]), int(fields[2]), int(fields[3])
+            expected = bytes.fromhex(fields[5])
+            digest = hashlib.scrypt(password.encode(), salt=bytes.fromhex(fields[4]), n=n, r=r, p=p,
+                                    maxmem=256 * n * r, dklen=len(expected))
+            return hmac.compare_digest(digest, expected)
+        if fields[0] == "pbkdf2_sha256" and len(fields) == 4:
+            expected = bytes.fromhex(fields[3])
+            digest = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(fields[2]), int(fields[1]),
+                                         len(expected))
+            return hmac.compare_digest(digest, expected)
+    except (ValueError, AttributeError) as e:
+        print(f"Ошибка проверки пароля: {e}")
+        return False
+    return hmac.compare_digest(password.encode(), str(stored).encode())
+
+
+def password_needs_rehash(stored):
+    if hasattr(hashlib, "scrypt"):
+        current = f"scrypt${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}$"
+    else:
+        current = f"pbkdf2_sha256${PASSWORD_PBKDF2_ITERATIONS}$"
+    return not str(stored).startswith(current)
+
+
+def split_statements(script):
+    statements = []
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \n;"):
+                statements.append(statement)
+            statement = ""
+    return statements
+
+
+class ServiceClient:
+    def __init__(self, address, timeout=SERVICE_TIMEOUT):
+        self.address = address
+        self.timeout = timeout
+        self.local = threading.local()
+        self.streams = []
+        self.lock = threading.Lock()
+
+    def connect(self):
+        stream = getattr(self.local, "stream", None)
+        if stream is None:
+            sock = socket.create_connection(self.address, self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            stream = sock.makefile("rwb")
+            sock.close()
+            self.local.stream = stream
+            with self.lock:
+                self.streams.append(stream)
+        return stream
+
+    def call(self, op, **args):
+        request = json.dumps({"op": op, **args}).encode() + b"\n"
+        try:
+            stream = self.connect()
+            stream.write(request)
+            stream.flush()
+        except OSError:
+            self.local.stream = None
+            stream = self.connect()
+            stream.write(request)
+            stream.flush()
+
+        try:
+            line = stream.readline()
+        except OSError:
+            self.local.stream = None
+            raise
+        if not line:
+            self.local.stream = None
+            raise ConnectionError("сервис рекордов закрыл соединение")
+        response = json.loads(line)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def close(self):
+        with self.lock:
+            for stream in self.streams:
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+            self.streams = []
+        self.local = threading.local()
+
+
+class Database:
+    PRAGMAS = [
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA cache_size = -8000",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA busy_timeout = 5000"
+    ]
+
+    REBUILD_RANKINGS = [
+        "DELETE FROM best_scores",
+        """
+        INSERT INTO best_scores (user_id, score, played_at)
+        SELECT user_id, MAX(score), played_at FROM scores GROUP BY user_id
+        """,
+        "DELETE FROM period_scores",
+        """
+        INSERT INTO period_scores (period, user_id, score, played_at)
+        SELECT 'day:' || date(played_at, 'unixepoch', 'localtime') AS period, user_id, MAX(score), played_at
+        FROM scores WHERE played_at > 0 GROUP BY period, user_id
+        """,
+        """
+        INSERT INTO period_scores (period, user_id, score, played_at)
+        SELECT 'week:' || date(played_at, 'unixepoch', 'localtime', 'weekday 0', '-6 days') AS period,
+               user_id, MAX(score), played_at
+        FROM scores WHERE played_at > 0 GROUP BY period, user_id
+        """,
+        "DELETE FROM rank_counts",
+        f"""
+        INSERT INTO rank_counts (board, bucket, players)
+        SELECT 'all', score / {RANK_BUCKET_SIZE} AS bucket, COUNT(*) FROM best_scores GROUP BY bucket
+        """,
+        f"""
+        INSERT INTO rank_counts (board, bucket, players)
+        SELECT period, score / {RANK_BUCKET_SIZE} AS bucket, COUNT(*) FROM period_scores GROUP BY period, bucket
+        """,
+        "DELETE FROM score_counts",
+        """
+        INSERT INTO score_counts (board, score, players)
+        SELECT 'all', score, COUNT(*) FROM best_scores GROUP BY score
+        """,
+        """
+        INSERT INTO score_counts (board, score, players)
+        SELECT period, score, COUNT(*) FROM period_scores GROUP BY period, score
+        """
+    ]
+
+    MIGRATIONS = [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            username UNIQUE NOT NULL,
+            password NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
+            score NOT NULL
+        );
+        """,
+        """
+        CREATE TABLE scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            score INTEGER NOT NULL,
+            played_at INTEGER NOT NULL
+        );
+        CREATE INDEX idx_scores_user ON scores (user_id, score DESC);
+
+        CREATE TABLE best_scores (
+            user_id INTEGER PRIMARY KEY NOT NULL REFERENCES users (id),
+            score INTEGER NOT NULL,
+            played_at INTEGER NOT NULL
+        );
+        CREATE INDEX idx_best_scores_score ON best_scores (score DESC, user_id);
+
+        CREATE TRIGGER scores_update_best AFTER INSERT ON scores
+        BEGIN
+            INSERT INTO best_scores (user_id, score, played_at)
+            VALUES (NEW.user_id, NEW.score, NEW.played_at)
+            ON CONFLICT (user_id) DO UPDATE SET score = excluded.score, played_at = excluded.played_at
+            WHERE excluded.score > best_scores.score;
+        END;
+
+        INSERT INTO scores (user_id, score, played_at)
+        SELECT id, score, 0 FROM records;
+        DROP TABLE records;
+        """,
+        """
+        ALTER TABLE scores ADD COLUMN replay BLOB;
+        """,
+        f"""
+        CREATE TABLE period_scores (
+            period TEXT NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            score INTEGER NOT NULL,
+            played_at INTEGER NOT NULL,
+            PRIMARY KEY (period, user_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX idx_period_scores_score ON period_scores (period, score DESC, user_id);
+
+        CREATE TABLE rank_counts (
+            board TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            players INTEGER NOT NULL,
+            PRIMARY KEY (board, bucket)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE score_counts (
+            board TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            players INTEGER NOT NULL,
+            PRIMARY KEY (board, score)
+        ) WITHOUT ROWID;
+
+        {"; ".join(REBUILD_RANKINGS)};
+
+        CREATE TRIGGER scores_update_period AFTER INSERT ON scores WHEN NEW.played_at > 0
+        BEGIN
+            INSERT INTO period_scores (period, user_id, score, played_at)
+            VALUES ('day:' || date(NEW.played_at, 'unixepoch', 'localtime'),
+                    NEW.user_id, NEW.score, NEW.played_at),
+                   ('week:' || date(NEW.played_at, 'unixepoch', 'localtime', 'weekday 0', '-6 days'),
+                    NEW.user_id, NEW.score, NEW.played_at)
+            ON CONFLICT (period, user_id) DO UPDATE SET score = excluded.score, played_at = excluded.played_at
+            WHERE excluded.score > period_scores.score;
+        END;
+
+        CREATE TRIGGER best_scores_rank_insert AFTER INSERT ON best_scores
+        BEGIN
+            INSERT INTO rank_counts (board, bucket, players) VALUES ('all', NEW.score / {RANK_BUCKET_SIZE}, 1)
+            ON CONFLICT (board, bucket) DO UPDATE SET players = players + 1;
+            INSERT INTO score_counts (board, score, players) VALUES ('all', NEW.score, 1)
+            ON CONFLICT (board, score) DO UPDATE SET players = players + 1;
+        END;
+
+        CREATE TRIGGER best_scores_rank_update AFTER UPDATE OF score ON best_scores
+        BEGIN
+            UPDATE rank_counts SET players = players - 1
+            WHERE board = 'all' AND bucket = OLD.score / {RANK_BUCKET_SIZE};
+            INSERT INTO rank_counts (board, bucket, players) VALUES ('all', NEW.score / {RANK_BUCKET_SIZE}, 1)
+            ON CONFLICT (board, bucket) DO UPDATE SET players = players + 1;
+            UPDATE score_counts SET players = players - 1 WHERE board = 'all' AND score = OLD.score;
+            INSERT INTO score_counts (board, score, players) VALUES ('all', NEW.score, 1)
+            ON CONFLICT (board, score) DO UPDATE SET players = players + 1;
+        END;
+
+        CREATE TRIGGER best_scores_rank_delete AFTER DELETE ON best_scores
+        BEGIN
+            UPDATE rank_counts SET players = players - 1
+            WHERE board = 'all' AND bucket = OLD.score / {RANK_BUCKET_SIZE};
+            UPDATE score_counts SET players = players - 1 WHERE board = 'all' AND score = OLD.score;
+        END;
+
+        CREATE TRIGGER period_scores_rank_insert AFTER INSERT ON period_scores
+        BEGIN
+            INSERT INTO rank_counts (board, bucket, players) VALUES (NEW.period, NEW.score / {RANK_BUCKET_SIZE}, 1)
+            ON CONFLICT (board, bucket) DO UPDATE SET players = players + 1;
+            INSERT INTO score_counts (board, score, players) VALUES (NEW.period, NEW.score, 1)
+            ON CONFLICT (board, score) DO UPDATE SET players = players + 1;
+        END;
+
+        CREATE TRIGGER period_scores_rank_update AFTER UPDATE OF score ON period_scores
+        BEGIN
+            UPDATE rank_counts SET players = players - 1
+            WHERE board = OLD.period AND bucket = OLD.score / {RANK_BUCKET_SIZE};
+            INSERT INTO rank_counts (board, bucket, players) VALUES (NEW.period, NEW.score / {RANK_BUCKET_SIZE}, 1)
+            ON CONFLICT (board, bucket) DO UPDATE SET players = players + 1;
+            UPDATE score_counts SET players = players - 1 WHERE board = OLD.period AND score = OLD.score;
+            INSERT INTO score_counts (board, score, players) VALUES (NEW.period, NEW.score, 1)
+            ON CONFLICT (board, score) DO UPDATE SET players = players + 1;
+        END;
+
+        CREATE TRIGGER period_scores_rank_delete AFTER DELETE ON period_scores
+        BEGIN
+            UPDATE rank_counts SET players = players - 1
+            WHERE board = OLD.period AND bucket = OLD.score / {RANK_BUCKET_SIZE};
+            UPDATE score_counts SET players = players - 1 WHERE board = OLD.period AND score = OLD.score;
+        END;
+        """
+    ]
+
+    SELECT_USER = "SELECT id, password FROM users WHERE username = ?"
+    INSERT_USER = "INSERT INTO users (username, password) VALUES (?, ?)"
+    UPDATE_PASSWORD = "UPDATE users SET password = ? WHERE id = ?"
+    INSERT_SCORE = "INSERT INTO scores (user_id, score, played_at, replay) VALUES (?, ?, ?, ?)"
+    SELECT_REPLAY = "SELECT replay FROM scores WHERE id = ?"
+    SELECT_REPLAYS = """
+        SELECT id, score, replay
+        FROM scores
+        WHERE replay IS NOT NULL AND id > ?
+        ORDER BY id
+        LIMIT ?
+    """
+    SELECT_TOP_PLAYERS = """
+        SELECT u.username, b.score, b.user_id
+        FROM best_scores b
+        JOIN users u ON u.id = b.user_id
+        ORDER BY b.score DESC, b.user_id
+        LIMIT ?
+    """
+
+    SELECT_LEADERBOARD = """
+        SELECT u.username, b.score, b.user_id
+        FROM best_scores b
+        JOIN users u ON u.id = b.user_id
+        WHERE b.score <= ?1 AND NOT (b.score = ?1 AND b.user_id <= ?2)
+        ORDER BY b.score DESC, b.user_id
+        LIMIT ?3
+    """
+    SELECT_PERIOD_LEADERBOARD = """
+        SELECT u.username, p.score, p.user_id
+        FROM period_scores p
+        JOIN users u ON u.id = p.user_id
+        WHERE p.period = ?4 AND p.score <= ?1 AND NOT (p.score = ?1 AND p.user_id <= ?2)
+        ORDER BY p.score DESC, p.user_id
+        LIMIT ?3
+    """
+    SELECT_BEST_SCORE = "SELECT score FROM best_scores WHERE user_id = ?"
+    SELECT_PERIOD_SCORE = "SELECT score FROM period_scores WHERE period = ? AND user_id = ?"
+    COUNT_RANK_BUCKETS = "SELECT COALESCE(SUM(players), 0) FROM rank_counts WHERE board = ? AND bucket > ?"
+    COUNT_SCORES_ABOVE = """
+        SELECT COALESCE(SUM(players), 0) FROM score_counts WHERE board = ? AND score > ? AND score < ?
+    """
+
+    def __init__(self, path=DATABASE_PATH, service=None):
+        self.path = path
+        self.service = None if service is None else ServiceClient(service)
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+        self.migrated = False
+        self.version_conn = None
+        self.version_lock = threading.Lock()
+        self.credentials = {}
+        self.credentials_key = os.urandom(PASSWORD_HASH_SIZE)
+
+    def connect(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.open_connection()
+            self.local.conn = conn
+        return conn
+
+    def open_connection(self):
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, cached_statements=64)
+        try:
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            with self.lock:
+                if not self.migrated:
+                    self.migrate(conn)
+                    self.migrated = True
+                self.connections.append(conn)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def migrate(self, conn):
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= len(self.MIGRATIONS):
+            return
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if version >= len(self.MIGRATIONS):
+                    conn.commit()
+                    return
+                for statement in split_statements(self.MIGRATIONS[version]):
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version + 1}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def close(self):
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+        self.local = threading.local()
+        self.version_conn = None
+        if self.service is not None:
+            self.service.close()
+
+    def use_service(self, address):
+        self.close()
+        self.service = ServiceClient(address)
+
+    def call_service(self, op, default, **args):
+        try:
+            return self.service.call(op, **args)
+        except Exception as e:
+            print(f"Ошибка сервиса рекордов: {e}")
+            return default
+
+    def register_or_login_user(self, username, password):
+        if self.service is not None:
+            return self.call_service("login", None, username=username, password=password)
+        try:
+            conn = self.connect()
+            user = conn.execute(self.SELECT_USER, (username,)).fetchone()
+            if user is None:
+                password_hash = hash_password(password)
+                try:
+                    with conn:
+                        id = conn.execute(self.INSERT_USER, (username, password_hash)).lastrowid
+                    self.remember_credentials(username, password, id, password_hash)
+                    return id
+                except sqlite3.IntegrityError:
+                    user = conn.execute(self.SELECT_USER, (username,)).fetchone()
+
+            id, stored = user
+            token = self.credentials_token(password)
+            cached = self.credentials.get(username)
+            if cached is not None and cached[1] == stored and hmac.compare_digest(cached[2], token):
+                return id
+            if not verify_password(password, stored):
+                return None
+
+            if password_needs_rehash(stored):
+                stored = hash_password(password)
+                with conn:
+                    conn.execute(self.UPDATE_PASSWORD, (stored, id))
+            self.remember_credentials(username, password, id, stored)
+            return id
+        except sqlite3.OperationalError as e:
+            print(f"Ошибка базы данных: {e}")
+            return None
+        except Exception as e:
+            print(f"Ошибка: {e}")
+            return None
+
+    def credentials_token(self, password):
+        return hmac.new(self.credentials_key, password.encode(), hashlib.sha256).digest()
+
+    def remember_credentials(self, username, password, id, stored):
+        with self.lock:
+            self.credentials[username] = (id, stored, self.credentials_token(password))
+
+    def save_record(self, id, score, played_at=None, replay=None):
+        if played_at is None:
+            played_at = int(time.time())
+        if self.service is not None:
+            return self.call_service("save", False, id=id, score=score, played_at=played_at,
+                                     replay=None if replay is None else base64.b64encode(replay).decode())
+        try:
+            conn = self.connect()
+            with conn:
+                conn.execute(self.INSERT_SCORE, (id, score, played_at, replay))
+            return True
+        except Exception as e:
+            print(f"Ошибка при сохранении рекорда: {e}")
+            return False
+
+    def save_records(self, records):
+        try:
+            conn = self.connect()
+            with conn:
+                conn.executemany(self.INSERT_SCORE, records)
+            return True
+        except Exception as e:
+            print(f"Ошибка при сохранении рекордов: {e}")
+            return False
+
+    def get_replay(self, score_id):
+        if self.service is not None:
+            replay = self.call_service("replay", None, score_id=score_id)
+            return None if replay is None else base64.b64decode(replay)
+        try:
+            row = self.connect().execute(self.SELECT_REPLAY, (score_id,)).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"Ошибка при получении повтора: {e}")
+            return None
+
+    def get_replays(self, after_id=0, limit=500):
+        if self.service is not None:
+            rows = self.call_service("replays", [], after_id=after_id, limit=limit)
+            return [(score_id, score, base64.b64decode(replay)) for score_id, score, replay in rows]
+        try:
+            return self.connect().execute(self.SELECT_REPLAYS, (after_id, limit)).fetchall()
+        except Exception as e:
+            print(f"Ошибка при получении повторов: {e}")
+            return []
+
+    def data_version(self):
+        if self.service is not None:
+            return self.call_service("data_version", None)
+        try:
+            with self.version_lock:
+                if self.version_conn is None:
+                    self.version_conn = self.open_connection()
+                return self.version_conn.execute("PRAGMA data_version").fetchone()[0]
+        except Exception as e:
+            print(f"Ошибка базы данных: {e}")
+            return None
+
+    def get_top_players(self, limit=5):
+        if self.service is not None:
+            return self.call_service("top", [], limit=limit)
+        try:
+            results = self.connect().execute(self.SELECT_TOP_PLAYERS, (limit,)).fetchall()
+
+            leaderboard = []
+            for row in results:
+                leaderboard.append({
+                    "name": row[0],
+                    "score": row[1],
+                    "id": row[2]
+                })
+
+            return leaderboard
+        except Exception as e:
+            print(f"Ошибка при получении таблицы лидеров: {e}")
+            return []
+
+    def get_leaderboard(self, board="all", limit=LEADERBOARD_PAGE_SIZE, after=None, now=None):
+        if self.service is not None:
+            return self.call_service("leaderboard", [], board=board, limit=limit, after=after, now=now)
+        period = leaderboard_period(board, now)
+        score, id = after if after is not None else (SCORE_MAX, 0)
+        try:
+            if period == "all":
+                results = self.connect().execute(self.SELECT_LEADERBOARD, (score, id, limit)).fetchall()
+            else:
+                results = self.connect().execute(self.SELECT_PERIOD_LEADERBOARD,
+                                                 (score, id, limit, period)).fetchall()
+            return [{"name": row[0], "score": row[1], "id": row[2]} for row in results]
+        except Exception as e:
+            print(f"Ошибка при получении таблицы лидеров: {e}")
+            return []
+
+    def get_rank(self, id, board="all", now=None):
+        if self.service is not None:
+            return self.call_service("rank", None, id=id, board=board, now=now)
+        period = leaderboard_period(board, now)
+        try:
+            conn = self.connect()
+            if period == "all":
+                row = conn.execute(self.SELECT_BEST_SCORE, (id,)).fetchone()
+            else:
+                row = conn.execute(self.SELECT_PERIOD_SCORE, (period, id)).fetchone()
+            if row is None:
+                return None
+
+            score = row[0]
+            bucket = score // RANK_BUCKET_SIZE
+            above = conn.execute(self.COUNT_RANK_BUCKETS, (period, bucket)).fetchone()[0]
+            bucket_end = (bucket + 1) * RANK_BUCKET_SIZE
+            above += conn.execute(self.COUNT_SCORES_ABOVE, (period, score, bucket_end)).fetchone()[0]
+            return above + 1
+        except Exception as e:
+            print(f"Ошибка при получении места в таблице: {e}")
+            return None
+
+
+class ScoreWriter:
+    def __init__(self, database, attempts=SCORE_SAVE_ATTEMPTS, backoff=SCORE_SAVE_BACKOFF, cache=None):
+        self.database = database
+        self.cache = cache
+        self.attempts = attempts
+        self.backoff = backoff
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = None
+
+    def submit(self, id, score, callback=None, replay=None, name=None):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name="score-writer", daemon=True)
+            self.thread.start()
+        self.requests.put((id, name, score, replay, callback))
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            id, name, score, replay, callback = request
+
+            saved = False
+            for attempt in range(self.attempts):
+                if self.database.save_record(id, score, replay=replay):
+                    saved = True
+                    break
+                if attempt < self.attempts - 1:
+                    time.sleep(self.backoff * 2 ** attempt)
+
+            ranks = None
+            if saved:
+                if self.cache is not None:
+                    self.cache.record(id, name, score)
+                if callback is not None:
+                    ranks = (self.database.get_rank(id), self.database.get_rank(id, "week"))
+            if callback is not None:
+                self.results.put((callback, saved, ranks))
+
+    def dispatch(self):
+        while not self.results.empty():
+            callback, saved, ranks = self.results.get_nowait()
+            callback(saved, ranks)
+
+    def close(self, timeout=5):
+        if self.thread is not None and self.thread.is_alive():
+            self.requests.put(None)
+            self.thread.join(timeout)
+        self.dispatch()
+
+
+class LoginWorker:
+    def __init__(self, database):
+        self.database = database
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = None
+        self.pending = 0
+
+    def submit(self, username, password, callback):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name="login-worker", daemon=True)
+            self.thread.start()
+        self.pending += 1
+        self.requests.put((username, password, callback))
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            username, password, callback = request
+            self.results.put((callback, self.database.register_or_login_user(username, password)))
+
+    def dispatch(self):
+        while not self.results.empty():
+            callback, id = self.results.get_nowait()
+            self.pending -= 1
+            callback(id)
+
+    def close(self, timeout=5):
+        if self.thread is not None and self.thread.is_alive():
+            self.requests.put(None)
+            self.thread.join(timeout)
+        self.results = queue.Queue()
+        self.pending = 0
+
+
+class LeaderboardWorker:
+    def __init__(self, database, cache=None):
+        self.database = database
+        self.cache = cache
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = None
+        self.pending = 0
+
+    def submit(self, board, after, callback):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name="leaderboard-worker", daemon=True)
+            self.thread.start()
+        self.pending += 1
+        self.requests.put((board, after, callback))
+
+    def fetch(self, board, after):
+        if self.cache is not None and board == "all" and after is None:
+            return self.cache.top(LEADERBOARD_PAGE_SIZE)
+        return self.database.get_leaderboard(board, LEADERBOARD_PAGE_SIZE, after)
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            board, after, callback = request
+            self.results.put((callback, self.fetch(board, after)))
+
+    def dispatch(self):
+        while not self.results.empty():
+            callback, page = self.results.get_nowait()
+            self.pending -= 1
+            callback(page)
+
+    def close(self, timeout=5):
+        if self.thread is not None and self.thread.is_alive():
+            self.requests.put(None)
+            self.thread.join(timeout)
+        self.results = queue.Queue()
+        self.pending = 0
+
+
+class LeaderboardCache:
+    def __init__(self, database, size=LEADERBOARD_CACHE_SIZE):
+        self.database = database
+        self.size = size
+        self.entries = {}
+        self.heap = []
+        self.ordered = None
+        self.data_version = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        self.entries = {}
+        self.heap = []
+        self.ordered = None
+        self.data_version = self.database.data_version()
+        for player in self.database.get_top_players(self.size):
+            self.entries[player["id"]] = player
+            self.heap.append((player["score"], player["id"]))
+        heapq.heapify(self.heap)
+
+    def top(self, limit=5):
+        with self.lock:
+            if self.data_version is None or self.database.data_version() != self.data_version:
+                self.load()
+            if self.ordered is None:
+                self.ordered = sorted(self.entries.values(), key=lambda player: (-player["score"], player["id"]))
+            return [dict(player) for player in self.ordered[:limit]]
+
+    def record(self, id, name, score):
+        with self.lock:
+            if self.data_version is None:
+                return
+
+            player = self.entries.get(id)
+            if player is not None:
+                if score <= player["score"]:
+                    return
+                player["score"] = score
+            elif len(self.entries) < self.size or score > self.heap[0][0]:
+                self.entries[id] = {"name": name, "score": score, "id": id}
+            else:
+                return
+
+            heapq.heappush(self.heap, (score, id))
+            while len(self.entries) > self.size:
+                lowest_score, lowest_id = heapq.heappop(self.heap)
+                if self.entries.get(lowest_id, {}).get("score") == lowest_score:
+                    del self.entries[lowest_id]
+            self.ordered = None
+            self.data_version = self.database.data_version()
@@ -0,0 +1,592 @@
+import heapq
+import random
+from bisect import bisect_left
+from operator import attrgetter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+
+PLAYER_SPEED = 5.0
+ENEMY_SPEED_MIN = 3.0
+ENEMY_SPEED_MAX = 4.5
+ROAD_SPEED_BASE = PLAYER_SPEED
+ENEMY_COUNT = 8
+ROAD_LINE_COUNT = 10
+SCORE_INCREMENT = 1
+SPEED_INCREASE_INTERVAL = 15
+SPEED_INCREASE_AMOUNT = 0.05
+SIMULATION_TICK_RATE = 60
+ENEMY_WIDTH = 36
+ENEMY_HEIGHT = 65
+FOLLOW_DISTANCE = 50
+SIDESTEP_CHANCE = 0.02
+RESPAWN_Y = -150
+SPAWN_Y = SCREEN_HEIGHT + 100
+PARKED_Y = -1000
+SPAWN_CYCLE = 5.0
+SPAWN_DENSITY_EXPONENT = 2
+SPAWN_LANE_GAP = 2 * FOLLOW_DISTANCE
+SPAWN_PASSABLE_GAP = 300
+SPAWN_RETRY_DELAY = 0.25
+TRAFFIC_BACKEND = "scheduled"
+
+
+class PlayerCar:
+    def __init__(self):
+        self.color = (0, 150, 255)
+        self.glow_color = (100, 200, 255)
+        self.width = 40
+        self.height = 70
+        self.speed = PLAYER_SPEED
+        self.parts = [
+            (0, 0, self.width + 10, self.height + 10, self.glow_color),
+            (0, 0, self.width, self.height, self.color),
+            (0, 15, self.width - 10, 15, (200, 230, 255)),
+            (-15, self.height / 2 - 5, 8, 5, (255, 255, 200)),
+            (15, self.height / 2 - 5, 8, 5, (255, 255, 200)),
+            (-15, -self.height / 2 + 5, 8, 5, (255, 50, 50)),
+            (15, -self.height / 2 + 5, 8, 5, (255, 50, 50))
+        ]
+        self.detail_parts = {"high": self.parts, "medium": self.parts[1:3], "low": self.parts[1:2]}
+
+
+class EnemyCar:
+    colors = [
+        (255, 80, 80), (255, 180, 50), (100, 220, 100), (180, 180, 220),
+        (255, 100, 180), (180, 100, 255), (80, 200, 220), (220, 220, 100)
+    ]
+
+    def __init__(self, lane, road_left, road_right, rng=random,
+                 speed_min=ENEMY_SPEED_MIN, speed_max=ENEMY_SPEED_MAX):
+        self.speed_min = speed_min
+        self.speed_max = speed_max
+        self.width = ENEMY_WIDTH
+        self.height = ENEMY_HEIGHT
+        self.road_left = road_left
+        self.road_right = road_right
+        self.respawn = True
+        self.set_lane(lane)
+        self.reset(rng)
+
+    def set_lane(self, lane):
+        self.lane = lane
+        self.lane_x = self.road_left + (lane + 0.5) * (self.road_right - self.road_left) / 4
+
+    def reset(self, rng):
+        self.random = rng
+        self.color = self.random.choice(self.colors)
+        self.base_speed = self.random.uniform(self.speed_min, self.speed_max)
+        self.reset_position()
+
+    @staticmethod
+    def create_parts(color, width, height):
+        return [
+            (0, 0, width, height, color),
+            (0, 12, width - 8, 12, (230, 240, 250)),
+            (-12, height / 2 - 4, 6, 4, (255, 255, 180)),
+            (12, height / 2 - 4, 6, 4, (255, 255, 180))
+        ]
+
+    @staticmethod
+    def create_detail_parts(color, width, height):
+        parts = EnemyCar.create_parts(color, width, height)
+        return {"high": parts, "medium": parts[:2], "low": parts[:1]}
+
+    def reset_position(self):
+        self.center_x = self.lane_x
+        self.center_y = SCREEN_HEIGHT + self.random.uniform(100, 500)
+        self.previous_x = self.center_x
+        self.previous_y = self.center_y
+        self.base_speed = self.random.uniform(self.speed_min, self.speed_max)
+
+    def update(self, delta_time, car_ahead=None, speed_multiplier=1.0):
+        self.previous_x = self.center_x
+        self.previous_y = self.center_y
+        effective_speed = self.base_speed * speed_multiplier
+        self.center_y -= effective_speed * delta_time * 60
+
+        if car_ahead is not None:
+            distance_y = self.center_y - car_ahead.center_y
+            if 0 <= distance_y < self.height + FOLLOW_DISTANCE:
+                self.base_speed = min(self.base_speed, car_ahead.base_speed * 0.9)
+                if self.random.random() < SIDESTEP_CHANCE:
+                    shift = self.random.uniform(-10, 10)
+                    new_x = self.center_x + shift
+                    if (new_x - self.width / 2 > self.road_left and
+                            new_x + self.width / 2 < self.road_right):
+                        self.center_x = new_x
+
+        if self.respawn and self.center_y < RESPAWN_Y:
+            self.reset_position()
+
+
+class LaneBuckets:
+    center_y = attrgetter("center_y")
+
+    def __init__(self, lane_count):
+        self.lanes = [[] for _ in range(lane_count)]
+        self.max_height = 0
+
+    def clear(self):
+        for lane in self.lanes:
+            lane.clear()
+        self.max_height = 0
+
+    def add(self, car):
+        self.max_height = max(self.max_height, car.height)
+        lane = self.lanes[car.lane]
+        lane.append(car)
+        self.resort(lane)
+
+    def update(self, delta_time, speed_multiplier):
+        for lane in self.lanes:
+            car_ahead = None
+            for car in lane:
+                car.update(delta_time, car_ahead, speed_multiplier)
+                car_ahead = car
+            self.resort(lane)
+
+    def query(self, y_min, y_max):
+        for lane in self.lanes:
+            for i in range(bisect_left(lane, y_min, key=self.center_y), len(lane)):
+                car = lane[i]
+                if car.center_y > y_max:
+                    break
+                yield car
+
+    @staticmethod
+    def resort(lane):
+        for i in range(1, len(lane)):
+            car = lane[i]
+            y = car.center_y
+            j = i - 1
+            while j >= 0 and lane[j].center_y > y:
+                lane[j + 1] = lane[j]
+                j -= 1
+            lane[j + 1] = car
+
+
+def swept_overlap(offset_x, offset_y, move_x, move_y, reach_x, reach_y):
+    t_enter = 0.0
+    t_exit = 1.0
+    for offset, move, reach in ((offset_x, move_x, reach_x), (offset_y, move_y, reach_y)):
+        if move == 0:
+            if abs(offset) >= reach:
+                return False
+            continue
+        t_near = (-reach - offset) / move
+        t_far = (reach - offset) / move
+        if t_near > t_far:
+            t_near, t_far = t_far, t_near
+        t_enter = max(t_enter, t_near)
+        t_exit = min(t_exit, t_far)
+        if t_enter >= t_exit:
+            return False
+    return True
+
+
+class ObjectTraffic:
+    def __init__(self, count, road_left, road_right, rng, speed_min, speed_max):
+        self.count = count
+        self.road_left = road_left
+        self.road_right = road_right
+        self.speed_min = speed_min
+        self.speed_max = speed_max
+        self.cars = []
+        self.lane_buckets = LaneBuckets(4)
+        self.generation = 0
+        self.reset(rng)
+
+    def reset(self, rng):
+        self.generation += 1
+        self.lane_buckets.clear()
+        for i in range(self.count):
+            if i < len(self.cars):
+                car = self.cars[i]
+                car.reset(rng)
+            else:
+                car = EnemyCar(i % 4, self.road_left, self.road_right, rng, self.speed_min, self.speed_max)
+                self.cars.append(car)
+            car.center_y = SCREEN_HEIGHT + 200 * (i // 4) + rng.uniform(0, 200)
+            self.lane_buckets.add(car)
+
+    def update(self, delta_time, speed_multiplier):
+        self.lane_buckets.update(delta_time, speed_multiplier)
+
+    def colors(self):
+        return [car.color for car in self.cars]
+
+    def positions(self, interpolation):
+        for car in self.cars:
+            yield (car.previous_x + (car.center_x - car.previous_x) * interpolation,
+                   car.previous_y + (car.center_y - car.previous_y) * interpolation)
+
+    def clearance(self, x, y, reach_x):
+        return min((car.center_y - y for car in self.cars
+                    if car.center_y >= y and abs(car.center_x - x) < reach_x), default=float("inf"))
+
+    def collides(self, player_x, player_y, player_move_x, player_half_width, player_half_height,
+                 speed_multiplier, delta_time):
+        max_enemy_move = self.speed_max * speed_multiplier * delta_time * 60
+        reach_y = player_half_height + self.lane_buckets.max_height / 2 + max_enemy_move
+
+        for enemy in self.lane_buckets.query(player_y - reach_y, player_y + reach_y):
+            if swept_overlap(enemy.previous_x - player_x, enemy.previous_y - player_y,
+                             enemy.center_x - enemy.previous_x - player_move_x,
+                             enemy.center_y - enemy.previous_y,
+                             player_half_width + enemy.width // 2,
+                             player_half_height + enemy.height // 2):
+                return True
+        return False
+
+
+class ScheduledTraffic(ObjectTraffic):
+    def __init__(self, count, road_left, road_right, rng, speed_min, speed_max):
+        self.free = []
+        self.events = []
+        self.time = 0.0
+        self.random = rng
+        self.pool_random = random.Random(0)
+        super().__init__(count, road_left, road_right, rng, speed_min, speed_max)
+
+    def reset(self, rng):
+        self.generation += 1
+        self.random = rng
+        self.time = 0.0
+        self.lane_buckets.clear()
+        while len(self.cars) < self.count:
+            self.create_car()
+        self.free = []
+        for car in reversed(self.cars):
+            self.park(car)
+
+        self.events = []
+        if self.count > 0:
+            self.events = [(rng.expovariate(self.spawn_rate(1.0)), lane) for lane in range(4)]
+            heapq.heapify(self.events)
+
+    def create_car(self):
+        car = EnemyCar(0, self.road_left, self.road_right, self.pool_random, self.speed_min, self.speed_max)
+        car.index = len(self.cars)
+        car.respawn = False
+        self.cars.append(car)
+        self.generation += 1
+        return car
+
+    def park(self, car):
+        car.center_x = car.previous_x = car.lane_x
+        car.center_y = car.previous_y = PARKED_Y
+        self.free.append(car.index)
+
+    def spawn_rate(self, speed_multiplier):
+        return self.count / 4 / SPAWN_CYCLE * speed_multiplier ** SPAWN_DENSITY_EXPONENT
+
+    def update(self, delta_time, speed_multiplier):
+        self.time += delta_time
+        self.lane_buckets.update(delta_time, speed_multiplier)
+
+        for lane in self.lane_buckets.lanes:
+            while lane and lane[0].center_y < RESPAWN_Y:
+                self.park(lane.pop(0))
+
+        events = self.events
+        while events and events[0][0] <= self.time:
+            _, lane = heapq.heappop(events)
+            if self.spawn(lane):
+                delay = self.random.expovariate(self.spawn_rate(speed_multiplier))
+            else:
+                delay = SPAWN_RETRY_DELAY
+            heapq.heappush(events, (self.time + delay, lane))
+
+    def spawn(self, lane):
+        lanes = self.lane_buckets.lanes
+        if lanes[lane] and lanes[lane][-1].center_y > SPAWN_Y - ENEMY_HEIGHT - SPAWN_LANE_GAP:
+            return False
+        blocked = sum(1 for i, other in enumerate(lanes)
+                      if i != lane and other and other[-1].center_y > SPAWN_Y - SPAWN_PASSABLE_GAP)
+        if blocked >= len(lanes) - 1:
+            return False
+
+        car = self.cars[self.free.pop()] if self.free else self.create_car()
+        car.set_lane(lane)
+        car.reset(self.random)
+        self.generation += 1
+        car.center_x = car.previous_x = car.lane_x
+        car.center_y = car.previous_y = SPAWN_Y
+        self.lane_buckets.add(car)
+        return True
+
+
+class VectorTraffic:
+    def __init__(self, count, road_left, road_right, rng, speed_min, speed_max):
+        if np is None:
+            raise RuntimeError("Для трафика на массивах нужен пакет numpy")
+
+        self.count = count
+        self.road_left = road_left
+        self.road_right = road_right
+        self.speed_min = speed_min
+        self.speed_max = speed_max
+
+        lane_width = (road_right - road_left) / 4
+        self.lanes_x = road_left + (np.arange(4) + 0.5) * lane_width
+
+        self.index = np.arange(count)
+        self.lane = self.index % 4
+        self.color_index = np.empty(count, dtype=np.int64)
+        self.x = np.empty(count)
+        self.y = np.empty(count)
+        self.previous_x = np.empty(count)
+        self.previous_y = np.empty(count)
+        self.base_speed = np.empty(count)
+        self.frame_x = np.empty(count)
+        self.frame_y = np.empty(count)
+        self.generation = 0
+        self.reset(rng)
+
+    def reset(self, rng):
+        self.generation += 1
+        self.random = np.random.default_rng(rng.getrandbits(64))
+        self.color_index[:] = self.random.integers(len(EnemyCar.colors), size=self.count)
+        self.x[:] = self.lanes_x[self.lane]
+        self.y[:] = SCREEN_HEIGHT + 200 * (self.index // 4) + self.random.uniform(0, 200, self.count)
+        self.previous_x[:] = self.x
+        self.previous_y[:] = self.y
+        self.base_speed[:] = self.random.uniform(self.speed_min, self.speed_max, self.count)
+
+    def respawn(self, index):
+        if not len(index):
+            return
+        self.x[index] = self.lanes_x[self.lane[index]]
+        self.y[index] = SCREEN_HEIGHT + self.random.uniform(100, 500, len(index))
+        self.previous_x[index] = self.x[index]
+        self.previous_y[index] = self.y[index]
+        self.base_speed[index] = self.random.uniform(self.speed_min, self.speed_max, len(index))
+
+    def update(self, delta_time, speed_multiplier):
+        if not self.count:
+            return
+        np.copyto(self.previous_x, self.x)
+        np.copyto(self.previous_y, self.y)
+        self.y -= self.base_speed * (speed_multiplier * delta_time * 60)
+
+        order = np.lexsort((self.y, self.lane))
+        lane = self.lane[order]
+        y = self.y[order]
+        close = np.flatnonzero((lane[1:] == lane[:-1]) & (y[1:] - y[:-1] < ENEMY_HEIGHT + FOLLOW_DISTANCE)) + 1
+        behind = order[close]
+        ahead = order[close - 1]
+        self.base_speed[behind] = np.minimum(self.base_speed[behind], self.base_speed[ahead] * 0.9)
+
+        shifting = behind[self.random.random(len(behind)) < SIDESTEP_CHANCE]
+        new_x = self.x[shifting] + self.random.uniform(-10, 10, len(shifting))
+        inside = (new_x - ENEMY_WIDTH / 2 > self.road_left) & (new_x + ENEMY_WIDTH / 2 < self.road_right)
+        self.x[shifting[inside]] = new_x[inside]
+
+        self.respawn(np.flatnonzero(self.y < RESPAWN_Y))
+
+    def colors(self):
+        return [EnemyCar.colors[i] for i in self.color_index.tolist()]
+
+    def positions(self, interpolation):
+        x = np.subtract(self.x, self.previous_x, out=self.frame_x)
+        x *= interpolation
+        x += self.previous_x
+        y = np.subtract(self.y, self.previous_y, out=self.frame_y)
+        y *= interpolation
+        y += self.previous_y
+        return zip(x.tolist(), y.tolist())
+
+    def clearance(self, x, y, reach_x):
+        ahead = (self.y >= y) & (np.abs(self.x - x) < reach_x)
+        return float((self.y[ahead] - y).min()) if ahead.any() else float("inf")
+
+    def collides(self, player_x, player_y, player_move_x, player_half_width, player_half_height,
+                 speed_multiplier, delta_time):
+        t_enter = np.zeros(self.count)
+        t_exit = np.ones(self.count)
+        axes = (
+            (self.previous_x - player_x, self.x - self.previous_x - player_move_x,
+             player_half_width + ENEMY_WIDTH // 2),
+            (self.previous_y - player_y, self.y - self.previous_y,
+             player_half_height + ENEMY_HEIGHT // 2)
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for offset, move, reach in axes:
+                t_near = (-reach - offset) / move
+                t_far = (reach - offset) / move
+                np.maximum(t_enter, np.minimum(t_near, t_far), out=t_enter)
+                np.minimum(t_exit, np.maximum(t_near, t_far), out=t_exit)
+        return bool(np.any(t_enter < t_exit))
+
+
+TRAFFIC_BACKENDS = {
+    "objects": ObjectTraffic,
+    "scheduled": ScheduledTraffic,
+    "numpy": VectorTraffic
+}
+
+
+class Simulation:
+    def __init__(self, seed=None, enemy_count=ENEMY_COUNT,
+                 enemy_speed_min=ENEMY_SPEED_MIN, enemy_speed_max=ENEMY_SPEED_MAX,
+                 speed_increase_interval=SPEED_INCREASE_INTERVAL,
+                 speed_increase_amount=SPEED_INCREASE_AMOUNT,
+                 tick_rate=SIMULATION_TICK_RATE, traffic=TRAFFIC_BACKEND):
+        self.random = random.Random()
+        self.seed = None
+        self.enemy_count = enemy_count
+        self.enemy_speed_min = enemy_speed_min
+        self.enemy_speed_max = enemy_speed_max
+        self.speed_increase_interval = speed_increase_interval
+        self.speed_increase_amount = speed_increase_amount
+        self.tick_rate = tick_rate
+        self.tick_time = 1 / tick_rate
+        self.traffic_name = traffic
+        self.traffic_backend = TRAFFIC_BACKENDS[traffic]
+
+        self.road_left = 180
+        self.road_right = 620
+        self.road_width = self.road_right - self.road_left
+        self.road_center_x = (self.road_left + self.road_right) // 2
+        self.lane_width = self.road_width / 4
+        self.lanes_x = [self.road_left + (i + 0.5) * self.lane_width for i in range(4)]
+
+        self.player = None
+        self.traffic = None
+        self.road_line_y = []
+        self.road_line_previous_y = []
+        self.road_line_head = 0
+        self.input_runs = []
+        self.profiler = None
+        self.setup(seed)
+
+    def use_traffic(self, traffic):
+        if traffic != self.traffic_name:
+            self.traffic_name = traffic
+            self.traffic_backend = TRAFFIC_BACKENDS[traffic]
+            self.traffic = None
+
+    def setup(self, seed=None):
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.seed = seed
+        self.random.seed(seed)
+
+        if self.player is None:
+            self.player = PlayerCar()
+        self.player_center_x = self.road_center_x
+        self.player_previous_x = self.player_center_x
+        self.player_center_y = 120
+
+        if self.traffic is None:
+            self.traffic = self.traffic_backend(self.enemy_count, self.road_left, self.road_right, self.random,
+                                                self.enemy_speed_min, self.enemy_speed_max)
+        else:
+            self.traffic.reset(self.random)
+
+        line_spacing = SCREEN_HEIGHT // 20
+        self.road_line_y[:] = [i * line_spacing for i in range(20)]
+        self.road_line_previous_y[:] = self.road_line_y
+        self.road_line_head = len(self.road_line_y) - 1
+
+        self.score = 0
+        self.game_over = False
+        self.left_pressed = False
+        self.right_pressed = False
+        self.ticks = 0
+        self.input_runs = []
+        self.game_time = 0
+        self.speed_multiplier = 1.0
+        self.last_speed_increase_time = 0
+
+    def tick(self):
+        if self.profiler is not None:
+            self.profiled_tick(self.profiler)
+            return
+
+        self.update_player()
+        self.scroll_road()
+        self.traffic.update(self.tick_time, self.speed_multiplier)
+        if self.check_collision(self.tick_time):
+            self.game_over = True
+
+    def profiled_tick(self, profiler):
+        started = profiler.start()
+        self.update_player()
+        profiler.stop("input", started)
+
+        started = profiler.start()
+        self.scroll_road()
+        profiler.stop("road", started)
+
+        started = profiler.start()
+        self.traffic.update(self.tick_time, self.speed_multiplier)
+        profiler.stop("traffic", started)
+
+        started = profiler.start()
+        if self.check_collision(self.tick_time):
+            self.game_over = True
+        profiler.stop("collision", started)
+
+    def update_player(self):
+        self.ticks += 1
+        self.record_input()
+        self.game_time += self.tick_time
+
+        if self.game_time - self.last_speed_increase_time >= self.speed_increase_interval:
+            self.speed_multiplier += self.speed_increase_amount
+            self.last_speed_increase_time = self.game_time
+
+        self.player_previous_x = self.player_center_x
+
+        if self.left_pressed and self.player_center_x > self.road_left + self.player.width // 2:
+            self.player_center_x -= self.player.speed
+            self.snap_to_lane()
+
+        if self.right_pressed and self.player_center_x < self.road_right - self.player.width // 2:
+            self.player_center_x += self.player.speed
+            self.snap_to_lane()
+
+        self.score += int(self.speed_multiplier)
+
+    def scroll_road(self):
+        road_step = ROAD_SPEED_BASE * self.speed_multiplier
+        line_y = self.road_line_y
+        line_previous_y = self.road_line_previous_y
+        head = self.road_line_head
+        for i in range(len(line_y)):
+            y = line_y[i]
+            line_previous_y[i] = y
+            y -= road_step
+            if y < -40:
+                y = line_y[head] + 40
+                line_previous_y[i] = y
+                head = i
+            line_y[i] = y
+        self.road_line_head = head
+
+    def snap_to_lane(self):
+        lane = int((self.player_center_x - self.road_left) // self.lane_width)
+        nearest_lane = self.lanes_x[min(max(lane, 0), 3)]
+        if abs(self.player_center_x - nearest_lane) < 5:
+            self.player_center_x = nearest_lane
+
+    def record_input(self):
+        state = self.left_pressed | self.right_pressed << 1
+        runs = self.input_runs
+        if runs and runs[-1][0] == state:
+            runs[-1][1] += 1
+        else:
+            runs.append([state, 1])
+
+    def check_collision(self, delta_time):
+        return self.traffic.collides(self.player_previous_x, self.player_center_y,
+                                     self.player_center_x - self.player_previous_x,
+                                     self.player.width // 2, self.player.height // 2,
+                                     self.speed_multiplier, delta_time)
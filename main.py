@@ -1,119 +1,120 @@
+import argparse
 import arcade
-import random
-import sqlite3
+import gc
+import time
+from array import array
+
+from arcade import shape_list
+from arcade.gl import BufferDescription
+
+from database import (LEADERBOARD_PAGE_SIZE, LEADERBOARDS, SERVICE_HOST, SERVICE_PORT, Database, LeaderboardCache,
+                      LeaderboardWorker, LoginWorker, ScoreWriter)
+from engine import ENEMY_HEIGHT, ENEMY_WIDTH, SCREEN_HEIGHT, SCREEN_WIDTH, EnemyCar, Simulation
+from profiler import PROFILE_REPORT_PATH, FrameProfiler
+from quality import QUALITY_MODE, QUALITY_MODES, QualityController
+from replay import apply_input, decode_replay, encode_replay, replay_inputs
+from resources import FONT_NAME, PRELOAD_FRAME_BUDGET, PRELOAD_MODE, PRELOAD_MODES, ResourceManager
 
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 600
 SCREEN_TITLE = "Traffic Racer Lite"
 
-PLAYER_SPEED = 5.0
-ENEMY_SPEED_MIN = 3.0
-ENEMY_SPEED_MAX = 4.5
-ROAD_SPEED_BASE = PLAYER_SPEED
-ENEMY_COUNT = 8
-ROAD_LINE_COUNT = 10
-SCORE_INCREMENT = 1
 GAME_OVER_DURATION = 2
-SPEED_INCREASE_INTERVAL = 15
-SPEED_INCREASE_AMOUNT = 0.05
+MAX_FRAME_TIME = 0.25
+FRAME_RATE = 120
+RENDER_MODE = "batched"
+TRAFFIC_BACKEND = "scheduled"
+QUAD_BATCH_CAPACITY = 256
 
+REGISTRATION_FONTS = [(28, True), (22, True), (18, True), (16, False), (14, False), (14, True), (12, False)]
+LEADERBOARD_NAMES = {"day": "за сегодня", "week": "за неделю", "all": "за всё время"}
+GAME_FONTS = [(24, True), (20, True), (16, True), (11, False), (48, True), (36, True), (32, True), (22, False)]
 
-class Database:
-    @staticmethod
-    def connect():
-        return sqlite3.connect("carsgame.db")
 
-    @staticmethod
-    def register_or_login_user(username, password):
-        conn = Database.connect()
-        cursor = conn.cursor()
+database = Database()
+leaderboard_cache = LeaderboardCache(database)
+score_writer = ScoreWriter(database, cache=leaderboard_cache)
+login_worker = LoginWorker(database)
+leaderboard_worker = LeaderboardWorker(database, leaderboard_cache)
+profiler = FrameProfiler()
+quality = QualityController()
+resources = ResourceManager()
 
-        try:
-            cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-            existing_user = cursor.fetchone()
 
-            if existing_user:
-                cursor.execute("SELECT id FROM users WHERE username = ? AND password = ?", (username, password))
-                user = cursor.fetchone()
-                conn.close()
+class TextCache:
+    def __init__(self):
+        self.labels = {}
+
+    def get(self, text, x, y, color, font_size, key=None, **kwargs):
+        if key is None:
+            key = text
+        entry = self.labels.get(key)
+        if entry is None:
+            entry = [arcade.Text(text, x, y, color, font_size, **kwargs), color, None]
+            self.labels[key] = entry
+            return entry
+
+        label = entry[0]
+        label.text = text
+        if entry[1] != color:
+            label.color = color
+            entry[1] = color
+        return entry
+
+    def draw(self, text, x, y, color, font_size, key=None, **kwargs):
+        self.get(text, x, y, color, font_size, key, **kwargs)[0].draw()
+
+    def draw_value(self, template, value, x, y, color, font_size, key=None, **kwargs):
+        if key is None:
+            key = template
+        entry = self.labels.get(key)
+        if entry is None or entry[2] != value:
+            entry = self.get(template.format(value), x, y, color, font_size, key, **kwargs)
+            entry[2] = value
+        entry[0].draw()
+
+
+class LoadingView(arcade.View):
+    def __init__(self):
+        super().__init__()
+        self.text_cache = TextCache()
+        self.drawn = False
 
-                if user:
-                    return user[0]
-                else:
-                    return None
-            else:
-                cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password))
-                id = cursor.lastrowid
-                conn.commit()
-                conn.close()
-                return id
-        except sqlite3.OperationalError as e:
-            print(f"Ошибка базы данных: {e}")
-            conn.close()
-            return None
-        except Exception as e:
-            print(f"Ошибка: {e}")
-            conn.close()
-            return None
-
-    @staticmethod
-    def save_record(id, score):
-        try:
-            conn = Database.connect()
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO records (id, score) VALUES (?, ?)", (id, score))
-            conn.commit()
-            conn.close()
-            return True
-        except Exception as e:
-            print(f"Ошибка при сохранении рекорда: {e}")
-            return False
-
-    @staticmethod
-    def get_top_players(limit=5):
-        try:
-            conn = Database.connect()
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                SELECT u.username, MAX(r.score) as max_score
-                FROM users u
-                JOIN records r ON u.id = r.id
-                GROUP BY u.id
-                ORDER BY max_score DESC
-                LIMIT ?
-            ''', (limit,))
-
-            results = cursor.fetchall()
-            conn.close()
-
-            leaderboard = []
-            for row in results:
-                leaderboard.append({
-                    "name": row[0],
-                    "score": row[1]
-                })
-
-            return leaderboard
-        except Exception as e:
-            print(f"Ошибка при получении таблицы лидеров: {e}")
-            return []
-
-
-class RegistrationWindow(arcade.Window):
+    def on_show_view(self):
+        self.window.set_caption(f"Загрузка - {SCREEN_TITLE}")
+        self.window.background_color = (30, 30, 40)
+        self.drawn = False
+
+    def on_draw(self):
+        self.drawn = True
+        self.clear()
+        self.text_cache.draw("Загрузка...", SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2,
+                             arcade.color.LIGHT_GRAY, 22, anchor_x="center", anchor_y="center",
+                             font_name=FONT_NAME)
+
+    def on_update(self, delta_time):
+        if not self.drawn or resources.loading():
+            return
+        self.window.preload()
+        self.window.show_registration()
+
+
+class RegistrationView(arcade.View):
     def __init__(self):
-        super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, "Регистрация - Traffic Racer Lite")
+        super().__init__()
 
         self.player_name = ""
         self.password = ""
         self.active_field = "name"
-        self.game_window = None
         self.error_message = ""
         self.error_timer = 0
+        self.text_cache = TextCache()
+        self.leaderboard = []
+        self.board = "all"
+        self.pages = []
+        self.leaderboard_request = 0
 
-        self.leaderboard = Database.get_top_players(5)
-
-        arcade.set_background_color((30, 30, 40))
+    def on_show_view(self):
+        self.window.set_caption("Регистрация - Traffic Racer Lite")
+        self.window.background_color = (30, 30, 40)
 
     def setup(self):
         self.player_name = ""
@@ -121,7 +122,37 @@ class RegistrationWindow(arcade.Window):
         self.active_field = "name"
         self.error_message = ""
         self.error_timer = 0
-        self.leaderboard = Database.get_top_players(5)
+        self.load_leaderboard("all", [])
+
+    def load_leaderboard(self, board, pages):
+        self.leaderboard_request += 1
+        request = self.leaderboard_request
+        leaderboard_worker.submit(board, pages[-1] if pages else None,
+                                  lambda page: self.on_leaderboard(request, board, pages, page))
+
+    def on_leaderboard(self, request, board, pages, page):
+        if request != self.leaderboard_request or (pages and not page):
+            return
+        self.board = board
+        self.pages = pages
+        self.leaderboard = page
+
+    def switch_board(self, step):
+        if leaderboard_worker.pending:
+            return
+        index = LEADERBOARDS.index(self.board)
+        self.load_leaderboard(LEADERBOARDS[(index + step) % len(LEADERBOARDS)], [])
+
+    def next_page(self):
+        if leaderboard_worker.pending or len(self.leaderboard) < LEADERBOARD_PAGE_SIZE:
+            return
+        last = self.leaderboard[-1]
+        self.load_leaderboard(self.board, self.pages + [(last["score"], last["id"])])
+
+    def previous_page(self):
+        if leaderboard_worker.pending or not self.pages:
+            return
+        self.load_leaderboard(self.board, self.pages[:-1])
 
     def draw_rectangle(self, center_x, center_y, width, height, color):
         left = center_x - width / 2
@@ -155,35 +186,40 @@ class RegistrationWindow(arcade.Window):
         self.draw_rectangle(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2,
                             SCREEN_WIDTH, SCREEN_HEIGHT, (20, 20, 30))
 
-        arcade.draw_text("РЕГИСТРАЦИЯ ИГРОКА", SCREEN_WIDTH // 2, SCREEN_HEIGHT - 60,
-                         arcade.color.GOLD, 28, anchor_x="center",
-                         font_name="Arial", bold=True)
+        self.text_cache.draw("РЕГИСТРАЦИЯ ИГРОКА", SCREEN_WIDTH // 2, SCREEN_HEIGHT - 60,
+                             arcade.color.GOLD, 28, anchor_x="center",
+                             font_name=FONT_NAME, bold=True)
 
         self.draw_registration_form()
 
         self.draw_leaderboard()
 
-        arcade.draw_text("TAB - переключение полей | ENTER - вход | ESC - выход",
-                         SCREEN_WIDTH // 2, 25, arcade.color.LIGHT_YELLOW,
-                         14, anchor_x="center", font_name="Arial")
+        self.text_cache.draw("TAB - переключение полей | ENTER - вход | ESC - выход",
+                             SCREEN_WIDTH // 2, 25, arcade.color.LIGHT_YELLOW,
+                             14, anchor_x="center", font_name=FONT_NAME)
 
         if self.error_message and self.error_timer > 0:
-            arcade.draw_text(self.error_message, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 150,
-                             arcade.color.RED, 16, anchor_x="center", font_name="Arial")
+            self.text_cache.draw(self.error_message, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 150,
+                                 arcade.color.RED, 16, key="error", anchor_x="center", font_name=FONT_NAME)
+
+        if self.window.started is not None:
+            if profiler.enabled:
+                profiler.record("startup", (time.perf_counter() - self.window.started) * 1000)
+            self.window.started = None
 
     def draw_registration_form(self):
         form_x = SCREEN_WIDTH // 4
         form_start_y = SCREEN_HEIGHT - 130
 
-        arcade.draw_text("ВХОД В ИГРУ", form_x, form_start_y,
-                         arcade.color.CYAN, 22, anchor_x="center",
-                         font_name="Arial", bold=True)
+        self.text_cache.draw("ВХОД В ИГРУ", form_x, form_start_y,
+                             arcade.color.CYAN, 22, anchor_x="center",
+                             font_name=FONT_NAME, bold=True)
 
         y_position = form_start_y - 50
 
-        arcade.draw_text("Имя:", form_x - 120, y_position - 5,
-                         arcade.color.WHITE, 16, anchor_x="right",
-                         font_name="Arial")
+        self.text_cache.draw("Имя:", form_x - 120, y_position - 5,
+                             arcade.color.WHITE, 16, anchor_x="right",
+                             font_name=FONT_NAME)
 
         field_color = (100, 180, 255) if self.active_field == "name" else arcade.color.WHITE
         field_width = 250
@@ -193,15 +229,15 @@ class RegistrationWindow(arcade.Window):
 
         display_name = self.player_name if self.player_name else "Введите имя..."
         name_color = arcade.color.WHITE if self.player_name else (150, 150, 150)
-        arcade.draw_text(display_name, form_x + 40 - field_width / 2 + 10, y_position,
-                         name_color, 16, anchor_y="center",
-                         font_name="Arial", width=field_width - 20)
+        self.text_cache.draw(display_name, form_x + 40 - field_width / 2 + 10, y_position,
+                             name_color, 16, key="name_field", anchor_y="center",
+                             font_name=FONT_NAME, width=field_width - 20)
 
         y_position -= 60
 
-        arcade.draw_text("Пароль:", form_x - 110, y_position - 5,
-                         arcade.color.WHITE, 16, anchor_x="right",
-                         font_name="Arial")
+        self.text_cache.draw("Пароль:", form_x - 110, y_position - 5,
+                             arcade.color.WHITE, 16, anchor_x="right",
+                             font_name=FONT_NAME)
 
         field_color = (100, 180, 255) if self.active_field == "password" else arcade.color.WHITE
         self.draw_rectangle(form_x + 40, y_position, field_width, field_height, (40, 40, 50))
@@ -209,9 +245,9 @@ class RegistrationWindow(arcade.Window):
 
         display_password = "*" * len(self.password) if self.password else "Введите пароль..."
         password_color = arcade.color.WHITE if self.password else (150, 150, 150)
-        arcade.draw_text(display_password, form_x + 40 - field_width / 2 + 10, y_position,
-                         password_color, 16, anchor_y="center",
-                         font_name="Arial", width=field_width - 20)
+        self.text_cache.draw(display_password, form_x + 40 - field_width / 2 + 10, y_position,
+                             password_color, 16, key="password_field", anchor_y="center",
+                             font_name=FONT_NAME, width=field_width - 20)
 
         y_position -= 70
         button_width = 180
@@ -222,17 +258,17 @@ class RegistrationWindow(arcade.Window):
         self.draw_rectangle_outline(form_x, y_position, button_width, button_height, arcade.color.LIME_GREEN, 2)
 
         button_text_color = arcade.color.WHITE if self.player_name and self.password else (120, 120, 120)
-        arcade.draw_text("ВОЙТИ", form_x, y_position,
-                         button_text_color, 18, anchor_x="center", anchor_y="center",
-                         font_name="Arial", bold=True)
+        self.text_cache.draw("ПРОВЕРКА..." if login_worker.pending else "ВОЙТИ", form_x, y_position,
+                             button_text_color, 18, anchor_x="center", anchor_y="center",
+                             font_name=FONT_NAME, bold=True)
 
     def draw_leaderboard(self):
         leaderboard_x = SCREEN_WIDTH - SCREEN_WIDTH // 4
         leaderboard_start_y = SCREEN_HEIGHT - 130
 
-        arcade.draw_text("ТАБЛИЦА ЛИДЕРОВ", leaderboard_x, leaderboard_start_y,
-                         arcade.color.CYAN, 22, anchor_x="center",
-                         font_name="Arial", bold=True)
+        self.text_cache.draw("ТАБЛИЦА ЛИДЕРОВ", leaderboard_x, leaderboard_start_y,
+                             arcade.color.CYAN, 22, anchor_x="center",
+                             font_name=FONT_NAME, bold=True)
 
         table_width = 320
         table_height = 320
@@ -244,17 +280,17 @@ class RegistrationWindow(arcade.Window):
 
         header_y = leaderboard_start_y - 45
 
-        arcade.draw_text("№", leaderboard_x - 110, header_y - -7,
-                         arcade.color.YELLOW, 14, anchor_x="center",
-                         font_name="Arial", bold=True)
+        self.text_cache.draw("№", leaderboard_x - 110, header_y - -7,
+                             arcade.color.YELLOW, 14, anchor_x="center",
+                             font_name=FONT_NAME, bold=True)
 
-        arcade.draw_text("Игрок", leaderboard_x - 30, header_y - -7,
-                         arcade.color.YELLOW, 14, anchor_x="center",
-                         font_name="Arial", bold=True)
+        self.text_cache.draw("Игрок", leaderboard_x - 30, header_y - -7,
+                             arcade.color.YELLOW, 14, anchor_x="center",
+                             font_name=FONT_NAME, bold=True)
 
-        arcade.draw_text("Очки", leaderboard_x + 70, header_y - -7,
-                         arcade.color.YELLOW, 14, anchor_x="center",
-                         font_name="Arial", bold=True)
+        self.text_cache.draw("Очки", leaderboard_x + 70, header_y - -7,
+                             arcade.color.YELLOW, 14, anchor_x="center",
+                             font_name=FONT_NAME, bold=True)
 
         line_y = header_y - 10
         arcade.draw_line(leaderboard_x - table_width / 2 + 10, line_y,
@@ -266,64 +302,61 @@ class RegistrationWindow(arcade.Window):
         if not self.leaderboard:
             self.draw_rectangle(leaderboard_x, y_position - 35 / 2,
                                 table_width - 20, 35, (40, 40, 60))
-            arcade.draw_text("Нет данных", leaderboard_x, y_position,
-                             arcade.color.LIGHT_GRAY, 16, anchor_x="center", anchor_y="center",
-                             font_name="Arial")
+            self.text_cache.draw("Загрузка..." if leaderboard_worker.pending else "Нет данных",
+                                 leaderboard_x, y_position,
+                                 arcade.color.LIGHT_GRAY, 16, anchor_x="center", anchor_y="center",
+                                 font_name=FONT_NAME)
             y_position -= 40
         else:
+            page_start = len(self.pages) * LEADERBOARD_PAGE_SIZE
             for i, player in enumerate(self.leaderboard, 1):
                 row_color = (40, 40, 60) if i % 2 == 1 else (50, 50, 70)
                 row_height = 35
                 self.draw_rectangle(leaderboard_x, y_position - row_height / 2,
                                     table_width - 20, row_height, row_color)
 
-                if i == 1:
+                place = page_start + i
+                if place == 1:
                     place_color = arcade.color.GOLD
-                elif i == 2:
+                elif place == 2:
                     place_color = arcade.color.SILVER
-                elif i == 3:
+                elif place == 3:
                     place_color = (205, 127, 50)
                 else:
                     place_color = arcade.color.WHITE
 
-                arcade.draw_text(f"{i}.", leaderboard_x - 110, y_position,
-                                 place_color, 14, anchor_x="center", anchor_y="center",
-                                 font_name="Arial", bold=(i <= 3))
+                self.text_cache.draw(f"{place}.", leaderboard_x - 110, y_position,
+                                     place_color, 14, key=("rank", i, place <= 3), anchor_x="center", anchor_y="center",
+                                     font_name=FONT_NAME, bold=(place <= 3))
 
                 player_name = player["name"]
                 if len(player_name) > 10:
                     player_name = player_name[:8] + ".."
 
-                arcade.draw_text(player_name, leaderboard_x - 30, y_position,
-                                 arcade.color.WHITE, 14, anchor_x="center", anchor_y="center",
-                                 font_name="Arial")
+                self.text_cache.draw(player_name, leaderboard_x - 30, y_position,
+                                     arcade.color.WHITE, 14, key=("player", i), anchor_x="center", anchor_y="center",
+                                     font_name=FONT_NAME)
 
-                arcade.draw_text(str(player["score"]), leaderboard_x + 70, y_position,
-                                 arcade.color.WHITE, 14, anchor_x="center", anchor_y="center",
-                                 font_name="Arial")
+                self.text_cache.draw(str(player["score"]), leaderboard_x + 70, y_position,
+                                     arcade.color.WHITE, 14, key=("score", i), anchor_x="center", anchor_y="center",
+                                     font_name=FONT_NAME)
 
                 y_position -= row_height + 5
 
-        arcade.draw_text("Топ-5 игроков", leaderboard_x, y_position - 10,
-                         arcade.color.LIGHT_GRAY, 12, anchor_x="center",
-                         font_name="Arial")
+        self.text_cache.draw(f"Лучшие {LEADERBOARD_NAMES[self.board]}, стр. {len(self.pages) + 1}",
+                             leaderboard_x, y_position - 10, arcade.color.LIGHT_GRAY, 12, key="board",
+                             anchor_x="center", font_name=FONT_NAME)
+        self.text_cache.draw("Загрузка..." if leaderboard_worker.pending else "←→ - период | ↑↓ - листать",
+                             leaderboard_x, y_position - 30, arcade.color.LIGHT_GRAY, 12, key="board_hint",
+                             anchor_x="center", font_name=FONT_NAME)
 
     def on_key_press(self, key, modifiers):
         if key == arcade.key.ENTER:
+            if login_worker.pending:
+                return
             if self.player_name and self.password:
-                id = Database.register_or_login_user(self.player_name, self.password)
-
-                if id:
-                    self.close()
-                    game_window = MyGame(self.player_name, id)
-                    game_window.setup()
-                    arcade.run()
-                else:
-                    self.player_name = ""
-                    self.password = ""
-                    self.active_field = "name"
-                    self.error_message = "Неверный пароль!"
-                    self.error_timer = 3
+                player_name = self.player_name
+                login_worker.submit(player_name, self.password, lambda id: self.on_login(player_name, id))
             elif not self.player_name:
                 self.active_field = "name"
                 self.error_message = "Введите имя пользователя!"
@@ -342,9 +375,35 @@ class RegistrationWindow(arcade.Window):
                 self.player_name = self.player_name[:-1]
             elif self.active_field == "password" and self.password:
                 self.password = self.password[:-1]
+        elif key == arcade.key.LEFT:
+            self.switch_board(-1)
+        elif key == arcade.key.RIGHT:
+            self.switch_board(1)
+        elif key in (arcade.key.DOWN, arcade.key.PAGEDOWN):
+            self.next_page()
+        elif key in (arcade.key.UP, arcade.key.PAGEUP):
+            self.previous_page()
         elif key == arcade.key.ESCAPE:
             arcade.close_window()
 
+    def on_mouse_scroll(self, x, y, scroll_x, scroll_y):
+        if scroll_y < 0:
+            self.next_page()
+        elif scroll_y > 0:
+            self.previous_page()
+
+    def on_login(self, player_name, id):
+        if self.window.current_view is not self:
+            return
+        if id:
+            self.window.start_game(player_name, id)
+        else:
+            self.player_name = ""
+            self.password = ""
+            self.active_field = "name"
+            self.error_message = "Неверный пароль!"
+            self.error_timer = 3
+
     def on_key_release(self, symbol, modifiers):
         pass
 
@@ -358,219 +417,243 @@ class RegistrationWindow(arcade.Window):
                 if len(self.password) < 16:
                     self.password += text
 
-    def update(self, delta_time):
+    def on_update(self, delta_time):
+        score_writer.dispatch()
+        login_worker.dispatch()
+        leaderboard_worker.dispatch()
+        resources.warm(self.window.ctx, PRELOAD_FRAME_BUDGET)
+
         if self.error_timer > 0:
             self.error_timer -= delta_time
             if self.error_timer <= 0:
                 self.error_message = ""
 
 
-class PlayerCar:
-    def __init__(self):
-        self.color = (0, 150, 255)
-        self.glow_color = (100, 200, 255)
-        self.width = 40
-        self.height = 70
-        self.speed = PLAYER_SPEED
-
-    def draw(self, center_x, center_y):
-        glow_size = 10
-        left = center_x - (self.width + glow_size) / 2
-        right = center_x + (self.width + glow_size) / 2
-        bottom = center_y - (self.height + glow_size) / 2
-        top = center_y + (self.height + glow_size) / 2
-
-        arcade.draw_polygon_filled([
-            (left, bottom),
-            (right, bottom),
-            (right, top),
-            (left, top)
-        ], self.glow_color)
-
-        left = center_x - self.width / 2
-        right = center_x + self.width / 2
-        bottom = center_y - self.height / 2
-        top = center_y + self.height / 2
-
-        arcade.draw_polygon_filled([
-            (left, bottom),
-            (right, bottom),
-            (right, top),
-            (left, top)
-        ], self.color)
-
-        windshield_left = center_x - (self.width - 10) / 2
-        windshield_right = center_x + (self.width - 10) / 2
-        windshield_bottom = center_y + 7.5
-        windshield_top = center_y + 22.5
-
-        arcade.draw_polygon_filled([
-            (windshield_left, windshield_bottom),
-            (windshield_right, windshield_bottom),
-            (windshield_right, windshield_top),
-            (windshield_left, windshield_top)
-        ], (200, 230, 255))
-
-        arcade.draw_polygon_filled([
-            (center_x - 19, center_y + self.height / 2 - 7.5),
-            (center_x - 11, center_y + self.height / 2 - 7.5),
-            (center_x - 11, center_y + self.height / 2 - 2.5),
-            (center_x - 19, center_y + self.height / 2 - 2.5)
-        ], (255, 255, 200))
-
-        arcade.draw_polygon_filled([
-            (center_x + 11, center_y + self.height / 2 - 7.5),
-            (center_x + 19, center_y + self.height / 2 - 7.5),
-            (center_x + 19, center_y + self.height / 2 - 2.5),
-            (center_x + 11, center_y + self.height / 2 - 2.5)
-        ], (255, 255, 200))
-
-        arcade.draw_polygon_filled([
-            (center_x - 19, center_y - self.height / 2 + 2.5),
-            (center_x - 11, center_y - self.height / 2 + 2.5),
-            (center_x - 11, center_y - self.height / 2 + 7.5),
-            (center_x - 19, center_y - self.height / 2 + 7.5)
-        ], (255, 50, 50))
-
-        arcade.draw_polygon_filled([
-            (center_x + 11, center_y - self.height / 2 + 2.5),
-            (center_x + 19, center_y - self.height / 2 + 2.5),
-            (center_x + 19, center_y - self.height / 2 + 7.5),
-            (center_x + 11, center_y - self.height / 2 + 7.5)
-        ], (255, 50, 50))
-
-
-class EnemyCar:
-    def __init__(self, lane, road_left, road_right):
-        self.colors = [
-            (255, 80, 80), (255, 180, 50), (100, 220, 100), (180, 180, 220),
-            (255, 100, 180), (180, 100, 255), (80, 200, 220), (220, 220, 100)
-        ]
-        self.color = random.choice(self.colors)
-        self.width = 36
-        self.height = 65
-        self.lane = lane
-        self.road_left = road_left
-        self.road_right = road_right
-        self.base_speed = random.uniform(ENEMY_SPEED_MIN, ENEMY_SPEED_MAX)
-        self.reset_position()
-
-    def reset_position(self):
-        road_width = self.road_right - self.road_left
-        lane_width = road_width / 4
-        self.center_x = self.road_left + (self.lane + 0.5) * lane_width
-        self.center_y = SCREEN_HEIGHT + random.uniform(100, 500)
-        self.base_speed = random.uniform(ENEMY_SPEED_MIN, ENEMY_SPEED_MAX)
+class QuadBatch:
+    VERTEX_SHADER = """
+        #version 330
+
+        uniform WindowBlock {
+            mat4 projection;
+            mat4 view;
+        } window;
+
+        in vec2 in_vert;
+        in vec4 in_rect;
+        in vec4 in_color;
+
+        out vec4 v_color;
+
+        void main() {
+            vec2 position = in_rect.xy + in_vert * in_rect.zw;
+            gl_Position = window.projection * window.view * vec4(position, 0.0, 1.0);
+            v_color = in_color / 255.0;
+        }
+    """
+
+    FRAGMENT_SHADER = """
+        #version 330
+
+        in vec4 v_color;
+        out vec4 out_color;
+
+        void main() {
+            out_color = v_color;
+        }
+    """
+
+    FLOATS_PER_QUAD = 8
+
+    def __init__(self, ctx, capacity=QUAD_BATCH_CAPACITY):
+        self.ctx = ctx
+        self.program = ctx.program(vertex_shader=self.VERTEX_SHADER,
+                                   fragment_shader=self.FRAGMENT_SHADER)
+        self.vertex_buffer = ctx.buffer(data=array("f", [
+            -0.5, -0.5,
+            0.5, -0.5,
+            -0.5, 0.5,
+            0.5, 0.5
+        ]))
+        self.count = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.data = array("f", bytes(capacity * self.FLOATS_PER_QUAD * 4))
+        self.instance_buffer = self.ctx.buffer(reserve=len(self.data) * 4)
+        self.geometry = self.ctx.geometry([
+            BufferDescription(self.vertex_buffer, "2f", ["in_vert"]),
+            BufferDescription(self.instance_buffer, "4f 4f", ["in_rect", "in_color"], instanced=True)
+        ], mode=self.ctx.TRIANGLE_STRIP)
+
+    def clear(self):
+        self.count = 0
+
+    def add(self, center_x, center_y, width, height, color):
+        if self.count == self.capacity:
+            old_data = self.data
+            self.allocate(self.capacity * 2)
+            self.data[:len(old_data)] = old_data
+
+        i = self.count * self.FLOATS_PER_QUAD
+        data = self.data
+        data[i] = center_x
+        data[i + 1] = center_y
+        data[i + 2] = width
+        data[i + 3] = height
+        data[i + 4] = color[0]
+        data[i + 5] = color[1]
+        data[i + 6] = color[2]
+        data[i + 7] = color[3] if len(color) > 3 else 255
+        self.count += 1
 
     def draw(self):
-        left = self.center_x - self.width / 2
-        right = self.center_x + self.width / 2
-        bottom = self.center_y - self.height / 2
-        top = self.center_y + self.height / 2
+        if not self.count:
+            return
+        size = self.count * self.FLOATS_PER_QUAD * 4
+        self.instance_buffer.write(memoryview(self.data).cast("B")[:size])
+        self.ctx.enable(self.ctx.BLEND)
+        self.geometry.render(self.program, instances=self.count)
 
-        arcade.draw_polygon_filled([
-            (left, bottom),
-            (right, bottom),
-            (right, top),
-            (left, top)
-        ], self.color)
 
-        windshield_left = self.center_x - (self.width - 8) / 2
-        windshield_right = self.center_x + (self.width - 8) / 2
-        windshield_bottom = self.center_y + 6
-        windshield_top = self.center_y + 18
+class GameView(arcade.View):
+    def __init__(self):
+        super().__init__()
+        self.player_name = ""
+        self.id = None
+        self.simulation = Simulation(traffic=TRAFFIC_BACKEND)
+        self.simulation.profiler = profiler
+        self.replay = None
+        self.replay_states = None
+        self.replay_matched = False
+        self.game_over_time = 0
+        self.score_saved = False
+        self.score_save_failed = False
+        self.ranks = None
+        self.round = 0
+        self.accumulator = 0
+        self.interpolation = 1.0
 
-        arcade.draw_polygon_filled([
-            (windshield_left, windshield_bottom),
-            (windshield_right, windshield_bottom),
-            (windshield_right, windshield_top),
-            (windshield_left, windshield_top)
-        ], (230, 240, 250))
+        self.road_left = self.simulation.road_left
+        self.road_right = self.simulation.road_right
+        self.road_width = self.simulation.road_width
+        self.road_center_x = self.simulation.road_center_x
 
-        arcade.draw_polygon_filled([
-            (self.center_x - 15, self.center_y + self.height / 2 - 6),
-            (self.center_x - 9, self.center_y + self.height / 2 - 6),
-            (self.center_x - 9, self.center_y + self.height / 2 - 2),
-            (self.center_x - 15, self.center_y + self.height / 2 - 2)
-        ], (255, 255, 180))
+        lane_width = self.road_width // 4
+        self.lane_markers_x = [
+            self.road_left + lane_width,
+            self.road_left + 2 * lane_width,
+            self.road_left + 3 * lane_width
+        ]
 
-        arcade.draw_polygon_filled([
-            (self.center_x + 9, self.center_y + self.height / 2 - 6),
-            (self.center_x + 15, self.center_y + self.height / 2 - 6),
-            (self.center_x + 15, self.center_y + self.height / 2 - 2),
-            (self.center_x + 9, self.center_y + self.height / 2 - 2)
-        ], (255, 255, 180))
-
-    def update(self, delta_time, enemy_cars, speed_multiplier=1.0):
-        effective_speed = self.base_speed * speed_multiplier
-        self.center_y -= effective_speed * delta_time * 60
-
-        for enemy in enemy_cars:
-            if enemy != self and enemy.lane == self.lane:
-                distance_y = abs(self.center_y - enemy.center_y)
-                if distance_y < self.height + 50:
-                    self.base_speed = min(self.base_speed, enemy.base_speed * 0.9)
-                    if random.random() < 0.02:
-                        shift = random.uniform(-10, 10)
-                        new_x = self.center_x + shift
-                        if (new_x - self.width / 2 > self.road_left and
-                                new_x + self.width / 2 < self.road_right):
-                            self.center_x = new_x
-
-        if self.center_y < -150:
-            self.reset_position()
-
-
-class MyGame(arcade.Window):
-    def __init__(self, player_name, id):
-        super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
+        self.render_mode = RENDER_MODE
+        self.text_cache = TextCache()
+        self.quad_batch = QuadBatch(self.window.ctx)
+        self.car_textures = None
+        self.car_parts = {color: EnemyCar.create_detail_parts(color, ENEMY_WIDTH, ENEMY_HEIGHT)
+                          for color in EnemyCar.colors}
+        self.line_y = []
+        self.car_sprites = arcade.SpriteList()
+        self.enemy_sprites = []
+        self.enemy_parts = []
+        self.player_parts = []
+        self.player_sprite = None
+        self.traffic_generation = None
+        self.quality_level = None
+        self.update_time = 0.0
+        self.build_scenery()
+
+    def on_show_view(self):
+        self.window.set_caption(SCREEN_TITLE)
+        self.window.background_color = (50, 50, 50)
+        quality.reset()
+
+    def start(self, player_name, id):
         self.player_name = player_name
         self.id = id
-        self.player = None
-        self.enemy_cars = []
-        self.road_lines = []
-        self.score = 0
-        self.game_over = False
-        self.game_over_time = 0
-        self.score_saved = False
-        self.left_pressed = False
-        self.right_pressed = False
-        self.game_time = 0
-        self.speed_multiplier = 1.0
-        self.last_speed_increase_time = 0
-        arcade.set_background_color((40, 40, 50))
-
-        self.road_left = 180
-        self.road_right = 620
-        self.road_width = self.road_right - self.road_left
-        self.road_center_x = (self.road_left + self.road_right) // 2
+        self.replay = None
+        self.setup()
+
+    def start_replay(self, data):
+        self.player_name = "Повтор"
+        self.id = None
+        self.replay = decode_replay(data)
+        self.setup()
+
+    def build_scenery(self):
+        self.scenery_shapes = resources.shape_list(self.window.ctx, "scenery", self.create_scenery_shapes)
+        self.border_shapes = resources.shape_list(self.window.ctx, "borders", self.create_border_shapes)
+
+    def create_scenery_shapes(self):
+        shapes = shape_list.ShapeElementList()
+        shapes.append(shape_list.create_rectangle_filled(
+            self.road_left // 2, SCREEN_HEIGHT // 2, self.road_left, SCREEN_HEIGHT, (40, 80, 40, 255)))
+        shapes.append(shape_list.create_rectangle_filled(
+            SCREEN_WIDTH - self.road_left // 2, SCREEN_HEIGHT // 2, self.road_left, SCREEN_HEIGHT,
+            (40, 80, 40, 255)))
+        return shapes
+
+    def create_border_shapes(self):
+        shapes = shape_list.ShapeElementList()
+        shapes.append(shape_list.create_line(
+            self.road_left, 0, self.road_left, SCREEN_HEIGHT, (255, 255, 100, 255), 2))
+        shapes.append(shape_list.create_line(
+            self.road_right, 0, self.road_right, SCREEN_HEIGHT, (255, 255, 100, 255), 2))
+        return shapes
 
     def setup(self):
-        self.player = PlayerCar()
-        self.player_center_x = self.road_center_x
-        self.player_center_y = 120
-
-        self.enemy_cars = []
-        for lane in range(4):
-            for i in range(2):
-                enemy = EnemyCar(lane, self.road_left, self.road_right)
-                enemy.center_y = SCREEN_HEIGHT + 200 * i + random.uniform(0, 200)
-                self.enemy_cars.append(enemy)
-
-        self.road_lines = []
-        line_spacing = SCREEN_HEIGHT // 20
-        for i in range(20):
-            self.road_lines.append({'y': i * line_spacing, 'speed': ROAD_SPEED_BASE})
-
-        self.score = 0
-        self.game_over = False
+        if self.replay is not None:
+            seed, _, input_runs, traffic = self.replay
+            self.simulation.use_traffic(traffic)
+            self.simulation.setup(seed)
+            self.replay_states = replay_inputs(input_runs)
+        else:
+            self.simulation.use_traffic(TRAFFIC_BACKEND)
+            self.simulation.setup()
+            self.replay_states = None
+
+        self.sync_cars()
+        self.line_y[:] = self.simulation.road_line_y
+
         self.game_over_time = 0
         self.score_saved = False
-        self.left_pressed = False
-        self.right_pressed = False
-        self.game_time = 0
-        self.speed_multiplier = 1.0
-        self.last_speed_increase_time = 0
+        self.score_save_failed = False
+        self.ranks = None
+        self.round += 1
+        self.accumulator = 0
+        self.interpolation = 1.0
+
+    def sync_cars(self):
+        traffic = self.simulation.traffic
+        level = quality.name
+        self.traffic_generation = traffic.generation
+        self.quality_level = level
+        self.car_textures = resources.get_car_textures(level)
+        colors = traffic.colors()
+        if len(self.enemy_sprites) != len(colors):
+            self.car_sprites.clear()
+            self.enemy_sprites = [arcade.Sprite(self.car_textures[color]) for color in colors]
+            self.player_sprite = arcade.Sprite(self.car_textures["player"])
+            self.car_sprites.extend(self.enemy_sprites)
+            self.car_sprites.append(self.player_sprite)
+        else:
+            for sprite, color in zip(self.enemy_sprites, colors):
+                sprite.texture = self.car_textures[color]
+            self.player_sprite.texture = self.car_textures["player"]
+        self.enemy_parts = [self.car_parts[color][level] for color in colors]
+        self.player_parts = self.simulation.player.detail_parts[level]
+
+    def lerp(self, previous, current):
+        return previous + (current - previous) * self.interpolation
+
+    def interpolate_road_lines(self):
+        line_y = self.line_y
+        previous_y = self.simulation.road_line_previous_y
+        current_y = self.simulation.road_line_y
+        interpolation = self.interpolation
+        for i in range(len(line_y)):
+            line_y[i] = previous_y[i] + (current_y[i] - previous_y[i]) * interpolation
+        return line_y
 
     def draw_rectangle(self, center_x, center_y, width, height, color):
         left = center_x - width / 2
@@ -590,12 +673,67 @@ class MyGame(arcade.Window):
             (left, bottom), (right, bottom), (right, top), (left, top)
         ], color)
 
+    def draw_car(self, center_x, center_y, parts):
+        for offset_x, offset_y, width, height, color in parts:
+            self.draw_rectangle(center_x + offset_x, center_y + offset_y, width, height, color)
+
     def on_draw(self):
+        draw_started = time.perf_counter()
+        profiler.frame()
+        started = profiler.start()
         self.clear()
 
-        self.draw_rectangle(self.road_center_x, SCREEN_HEIGHT // 2,
-                            self.road_width, SCREEN_HEIGHT, (50, 50, 50))
-
+        if self.simulation.traffic.generation != self.traffic_generation or quality.name != self.quality_level:
+            self.sync_cars()
+        if self.render_mode == "batched":
+            self.draw_world_batched()
+        else:
+            self.draw_world_immediate()
+
+        section = profiler.start()
+        self.draw_hud()
+        profiler.stop("hud", section)
+        profiler.stop("draw", started)
+
+        if profiler.enabled:
+            self.draw_profiler()
+        now = time.perf_counter()
+        quality.frame(now, self.update_time + now - draw_started)
+
+    def add_road_lines(self, batch, line_y):
+        for y in line_y:
+            batch.add(self.road_center_x, y, 8, 40, (255, 255, 200))
+        for marker_x in self.lane_markers_x:
+            for y in line_y:
+                batch.add(marker_x, y + 20, 4, 20, (200, 200, 200))
+
+    def draw_world_batched(self):
+        simulation = self.simulation
+        section = profiler.start()
+        self.scenery_shapes.draw()
+
+        batch = self.quad_batch
+        batch.clear()
+        self.add_road_lines(batch, self.interpolate_road_lines())
+        batch.draw()
+        profiler.stop("scenery", section)
+
+        section = profiler.start()
+        for (x, y), sprite in zip(simulation.traffic.positions(self.interpolation), self.enemy_sprites):
+            sprite.center_x = x
+            sprite.center_y = y
+        self.player_sprite.center_x = self.lerp(simulation.player_previous_x, simulation.player_center_x)
+        self.player_sprite.center_y = simulation.player_center_y
+        self.car_sprites.draw(pixelated=True)
+        profiler.stop("cars", section)
+
+        section = profiler.start()
+        self.border_shapes.draw()
+        profiler.stop("borders", section)
+
+    def draw_world_immediate(self):
+        simulation = self.simulation
+        section = profiler.start()
         self.draw_rectangle(self.road_left // 2, SCREEN_HEIGHT // 2,
                             self.road_left, SCREEN_HEIGHT, (40, 80, 40))
         self.draw_rectangle(SCREEN_WIDTH - self.road_left // 2, SCREEN_HEIGHT // 2,
@@ -603,172 +741,309 @@ class MyGame(arcade.Window):
 
         line_width = 8
         line_height = 40
-        for line in self.road_lines:
-            self.draw_road_line(self.road_center_x, line['y'],
-                                line_width, line_height, (255, 255, 200))
-
-        lane_width = self.road_width // 4
-        lane_markers_x = [
-            self.road_left + lane_width,
-            self.road_left + 2 * lane_width,
-            self.road_left + 3 * lane_width
-        ]
-        for marker_x in lane_markers_x:
-            for line in self.road_lines:
-                self.draw_road_line(marker_x, line['y'] + 20, 4, 20, (200, 200, 200))
+        line_y = self.interpolate_road_lines()
+        if quality.name == "low":
+            self.quad_batch.clear()
+            self.add_road_lines(self.quad_batch, line_y)
+            self.quad_batch.draw()
+        else:
+            for y in line_y:
+                self.draw_road_line(self.road_center_x, y, line_width, line_height, (255, 255, 200))
 
-        for enemy in self.enemy_cars:
-            enemy.draw()
+            for marker_x in self.lane_markers_x:
+                for y in line_y:
+                    self.draw_road_line(marker_x, y + 20, 4, 20, (200, 200, 200))
+        profiler.stop("scenery", section)
 
-        self.player.draw(self.player_center_x, self.player_center_y)
+        section = profiler.start()
+        for (x, y), parts in zip(simulation.traffic.positions(self.interpolation), self.enemy_parts):
+            self.draw_car(x, y, parts)
 
-        arcade.draw_line(self.road_left, 0, self.road_left, SCREEN_HEIGHT,
-                         (255, 255, 255), 2)
-        arcade.draw_line(self.road_right, 0, self.road_right, SCREEN_HEIGHT,
-                         (255, 255, 255), 2)
+        self.draw_car(self.lerp(simulation.player_previous_x, simulation.player_center_x),
+                      simulation.player_center_y, self.player_parts)
+        profiler.stop("cars", section)
 
+        section = profiler.start()
         arcade.draw_line(self.road_left, 0, self.road_left, SCREEN_HEIGHT,
                          (255, 255, 100), 2)
         arcade.draw_line(self.road_right, 0, self.road_right, SCREEN_HEIGHT,
                          (255, 255, 100), 2)
+        profiler.stop("borders", section)
 
-        player_text = f"ИГРОК: {self.player_name}"
-        arcade.draw_text(player_text, 15, SCREEN_HEIGHT - 35,
-                         (100, 200, 255), 20, font_name="Arial", bold=True)
+    def draw_hud(self):
+        simulation = self.simulation
+        self.text_cache.draw_value("ИГРОК: {}", self.player_name, 15, SCREEN_HEIGHT - 35,
+                                   (100, 200, 255), 20, font_name=FONT_NAME, bold=True)
 
-        score_text = f"СЧЁТ: {self.score}"
-        arcade.draw_text(score_text, 15, SCREEN_HEIGHT - 70,
-                         (255, 255, 255), 24, font_name="Arial", bold=True)
+        self.text_cache.draw_value("СЧЁТ: {}", simulation.score, 15, SCREEN_HEIGHT - 70,
+                                   (255, 255, 255), 24, font_name=FONT_NAME, bold=True)
 
-        speed_text = f"СКОРОСТЬ: x{self.speed_multiplier:.2f}"
-        arcade.draw_text(speed_text, 15, SCREEN_HEIGHT - 105,
-                         (255, 200, 100), 20, font_name="Arial", bold=True)
+        self.text_cache.draw_value("СКОРОСТЬ: x{:.2f}", simulation.speed_multiplier, 15, SCREEN_HEIGHT - 105,
+                                   (255, 200, 100), 20, font_name=FONT_NAME, bold=True)
 
-        time_text = f"ВРЕМЯ: {int(self.game_time)}с"
-        arcade.draw_text(time_text, 15, SCREEN_HEIGHT - 140,
-                         (100, 255, 200), 20, font_name="Arial", bold=True)
+        self.text_cache.draw_value("ВРЕМЯ: {}с", int(simulation.game_time), 15, SCREEN_HEIGHT - 140,
+                                   (100, 255, 200), 20, font_name=FONT_NAME, bold=True)
 
         instructions = "← → ДВИЖЕНИЕ | R РЕСТАРТ | ESC МЕНЮ"
-        arcade.draw_text(instructions, SCREEN_WIDTH // 2, 30,
-                         (200, 200, 255), 16, anchor_x="center",
-                         font_name="Arial", bold=True)
+        self.text_cache.draw(instructions, SCREEN_WIDTH // 2, 30,
+                             (200, 200, 255), 16, anchor_x="center",
+                             font_name=FONT_NAME, bold=True)
+
+    def draw_profiler(self):
+        lines = profiler.overlay_lines() + [quality.describe()]
+        label = self.text_cache.get("\n".join(lines), SCREEN_WIDTH - 340, SCREEN_HEIGHT - 10,
+                                    (200, 255, 200), 11, key="profiler", anchor_y="top", font_name=FONT_NAME,
+                                    multiline=True, width=340)[0]
+        height = label.content_height + 10
+        self.draw_rectangle(SCREEN_WIDTH - 175, SCREEN_HEIGHT - 5 - height / 2, 340, height, (0, 0, 0, 160))
+        label.draw()
 
-        if self.game_over:
-            self.draw_rectangle(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2,
-                                SCREEN_WIDTH, SCREEN_HEIGHT, (0, 0, 0, 180))
+    def on_update(self, delta_time):
+        update_started = time.perf_counter()
+        started = profiler.start()
+        section = profiler.start()
+        score_writer.dispatch()
+        profiler.stop("db", section)
+
+        simulation = self.simulation
+        self.accumulator += min(delta_time, MAX_FRAME_TIME)
+        while self.accumulator >= simulation.tick_time and not simulation.game_over:
+            if self.replay_states is not None:
+                apply_input(simulation, next(self.replay_states, 0))
+            simulation.tick()
+            self.accumulator -= simulation.tick_time
+        self.interpolation = min(self.accumulator / simulation.tick_time, 1.0)
+        profiler.stop("update", started)
+        self.update_time = time.perf_counter() - update_started
+
+        if simulation.game_over:
+            self.interpolation = 1.0
+            if self.replay is not None:
+                self.replay_matched = simulation.score == self.replay[1]
+            else:
+                self.submit_score()
+            self.window.show_view(self.window.game_over_view)
+
+    def submit_score(self):
+        round_number = self.round
+        simulation = self.simulation
+        score = simulation.score
+        replay = encode_replay(simulation.seed, score, simulation.input_runs, simulation.traffic_name)
+        score_writer.submit(self.id, score, lambda saved, ranks: self.on_score_saved(round_number, saved, ranks),
+                            replay, self.player_name)
+
+    def on_score_saved(self, round_number, saved, ranks):
+        if round_number != self.round:
+            return
+        self.score_saved = saved
+        self.score_save_failed = not saved
+        self.ranks = ranks
 
-            arcade.draw_text("ИГРА ОКОНЧЕНА", SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 60,
+    def on_key_press(self, key, modifiers):
+        if key == arcade.key.LEFT:
+            self.simulation.left_pressed = True
+        elif key == arcade.key.RIGHT:
+            self.simulation.right_pressed = True
+        elif key == arcade.key.R:
+            self.setup()
+        elif key == arcade.key.B:
+            self.render_mode = "immediate" if self.render_mode == "batched" else "batched"
+        elif key == arcade.key.F3:
+            profiler.toggle()
+        elif key == arcade.key.ESCAPE:
+            self.window.show_registration()
+
+    def on_key_release(self, key, modifiers):
+        if key == arcade.key.LEFT:
+            self.simulation.left_pressed = False
+        elif key == arcade.key.RIGHT:
+            self.simulation.right_pressed = False
+
+
+class GameOverView(arcade.View):
+    def __init__(self, game_view):
+        super().__init__()
+        self.game_view = game_view
+        self.text_cache = TextCache()
+
+    def on_draw(self):
+        game = self.game_view
+        game.on_draw()
+
+        started = profiler.start()
+        game.draw_rectangle(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2,
+                            SCREEN_WIDTH, SCREEN_HEIGHT, (0, 0, 0, 180))
+
+        self.text_cache.draw("ИГРА ОКОНЧЕНА", SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 60,
                              (255, 80, 80), 48, anchor_x="center", anchor_y="center",
-                             font_name="Arial", bold=True)
-            arcade.draw_text(f"Игрок: {self.player_name}", SCREEN_WIDTH // 2,
-                             SCREEN_HEIGHT // 2 + 10, (100, 200, 255), 32,
-                             anchor_x="center", anchor_y="center", font_name="Arial", bold=True)
-            arcade.draw_text(f"Счёт: {self.score}", SCREEN_WIDTH // 2,
-                             SCREEN_HEIGHT // 2 - 40, (255, 255, 255), 36,
-                             anchor_x="center", anchor_y="center", font_name="Arial", bold=True)
-
-            if self.score_saved:
-                save_text = "✓ Результат сохранён"
+                             font_name=FONT_NAME, bold=True)
+        self.text_cache.draw_value("Игрок: {}", game.player_name, SCREEN_WIDTH // 2,
+                                   SCREEN_HEIGHT // 2 + 10, (100, 200, 255), 32,
+                                   anchor_x="center", anchor_y="center", font_name=FONT_NAME, bold=True)
+        self.text_cache.draw_value("Счёт: {}", game.simulation.score, SCREEN_WIDTH // 2,
+                                   SCREEN_HEIGHT // 2 - 40, (255, 255, 255), 36,
+                                   anchor_x="center", anchor_y="center", font_name=FONT_NAME, bold=True)
+
+        if game.replay is not None:
+            if game.replay_matched:
+                save_text = "✓ Повтор совпал с записью"
                 save_color = (100, 255, 100)
             else:
-                save_text = "Сохранение результата..."
-                save_color = (255, 255, 100)
-
-            arcade.draw_text(save_text, SCREEN_WIDTH // 2,
-                             SCREEN_HEIGHT // 2 - 90, save_color, 22,
-                             anchor_x="center", anchor_y="center", font_name="Arial")
-
-            arcade.draw_text("ПРОБЕЛ - НОВАЯ ИГРА", SCREEN_WIDTH // 2,
+                save_text = f"Повтор не совпал: записано {game.replay[1]}"
+                save_color = (255, 100, 100)
+        elif game.score_saved:
+            save_text = "✓ Результат сохранён"
+            save_color = (100, 255, 100)
+        elif game.score_save_failed:
+            save_text = "Не удалось сохранить результат"
+            save_color = (255, 100, 100)
+        else:
+            save_text = "Сохранение результата..."
+            save_color = (255, 255, 100)
+
+        self.text_cache.draw(save_text, SCREEN_WIDTH // 2,
+                             SCREEN_HEIGHT // 2 - 90, save_color, 22, key="save_status",
+                             anchor_x="center", anchor_y="center", font_name=FONT_NAME)
+        if game.replay is None and game.ranks is not None and game.ranks[0] is not None:
+            rank, week_rank = game.ranks
+            self.text_cache.draw(f"Место: {rank} (за неделю: {week_rank})", SCREEN_WIDTH // 2,
+                                 SCREEN_HEIGHT // 2 - 117, (200, 200, 255), 16, key="rank",
+                                 anchor_x="center", anchor_y="center", font_name=FONT_NAME)
+
+        self.text_cache.draw("ПРОБЕЛ - НОВАЯ ИГРА", SCREEN_WIDTH // 2,
                              SCREEN_HEIGHT // 2 - 140, (255, 255, 200), 20,
-                             anchor_x="center", anchor_y="center", font_name="Arial", bold=True)
-            arcade.draw_text("ESC - ВЫХОД В МЕНЮ", SCREEN_WIDTH // 2,
+                             anchor_x="center", anchor_y="center", font_name=FONT_NAME, bold=True)
+        self.text_cache.draw("ESC - ВЫХОД В МЕНЮ", SCREEN_WIDTH // 2,
                              SCREEN_HEIGHT // 2 - 180, (255, 255, 200), 20,
-                             anchor_x="center", anchor_y="center", font_name="Arial", bold=True)
+                             anchor_x="center", anchor_y="center", font_name=FONT_NAME, bold=True)
+        profiler.stop("overlay", started)
 
     def on_update(self, delta_time):
-        if self.game_over:
-            if not self.score_saved:
-                if Database.save_record(self.id, self.score):
-                    self.score_saved = True
-            self.game_over_time += delta_time
-            return
-
-        self.game_time += delta_time
-
-        if self.game_time - self.last_speed_increase_time >= SPEED_INCREASE_INTERVAL:
-            self.speed_multiplier += SPEED_INCREASE_AMOUNT
-            self.last_speed_increase_time = self.game_time
+        score_writer.dispatch()
+        self.game_view.game_over_time += delta_time
 
-        road_width = self.road_right - self.road_left
-        lane_width = road_width / 4
-        lanes_x = [self.road_left + (i + 0.5) * lane_width for i in range(4)]
+    def on_key_press(self, key, modifiers):
+        if key == arcade.key.SPACE or key == arcade.key.R:
+            self.game_view.setup()
+            self.window.show_view(self.game_view)
+        elif key == arcade.key.ESCAPE:
+            self.window.show_registration()
 
-        if self.left_pressed and self.player_center_x > self.road_left + self.player.width // 2:
-            self.player_center_x -= self.player.speed
-            nearest_lane = min(lanes_x, key=lambda x: abs(x - self.player_center_x))
-            if abs(self.player_center_x - nearest_lane) < 5:
-                self.player_center_x = nearest_lane
 
-        if self.right_pressed and self.player_center_x < self.road_right - self.player.width // 2:
-            self.player_center_x += self.player.speed
-            nearest_lane = min(lanes_x, key=lambda x: abs(x - self.player_center_x))
-            if abs(self.player_center_x - nearest_lane) < 5:
-                self.player_center_x = nearest_lane
+class GameWindow(arcade.Window):
+    def __init__(self):
+        super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE,
+                         update_rate=1 / FRAME_RATE, draw_rate=1 / FRAME_RATE)
+        self.started = None
+        self.offscreen = None
+        self.loading_view = LoadingView()
+        self.registration_view = RegistrationView()
+        self.game_view = GameView()
+        self.game_over_view = GameOverView(self.game_view)
+
+    def draw_offscreen(self, view):
+        if self.offscreen is None:
+            self.offscreen = self.ctx.framebuffer(
+                color_attachments=[self.ctx.texture((SCREEN_WIDTH, SCREEN_HEIGHT))])
+        enabled = profiler.enabled
+        profiler.enabled = False
+        try:
+            with self.offscreen.activate():
+                view.on_draw()
+        finally:
+            profiler.enabled = enabled
 
-        for line in self.road_lines:
-            line['y'] -= line['speed'] * self.speed_multiplier
-            if line['y'] < -40:
-                max_y = max(l['y'] for l in self.road_lines)
-                line['y'] = max_y + 40
+    def warm_game(self):
+        self.game_view.setup()
+        self.draw_offscreen(self.game_view)
 
-        for enemy in self.enemy_cars:
-            enemy.update(delta_time, self.enemy_cars, self.speed_multiplier)
+    def warm_game_over(self):
+        self.draw_offscreen(self.game_over_view)
 
-        for enemy in self.enemy_cars:
-            player_left = self.player_center_x - self.player.width // 2
-            player_right = self.player_center_x + self.player.width // 2
-            player_top = self.player_center_y + self.player.height // 2
-            player_bottom = self.player_center_y - self.player.height // 2
+    def preload(self, wait=False):
+        if wait:
+            self.registration_view.setup()
+            self.draw_offscreen(self.registration_view)
+        resources.queue(self.warm_game)
+        resources.queue(self.warm_game_over)
+        resources.queue_fonts(REGISTRATION_FONTS + GAME_FONTS)
+        if wait:
+            resources.warm(self.ctx)
 
-            enemy_left = enemy.center_x - enemy.width // 2
-            enemy_right = enemy.center_x + enemy.width // 2
-            enemy_top = enemy.center_y + enemy.height // 2
-            enemy_bottom = enemy.center_y - enemy.height // 2
+    def show_loading(self):
+        self.show_view(self.loading_view)
 
-            if (player_right > enemy_left and player_left < enemy_right and
-                    player_bottom < enemy_top and player_top > enemy_bottom):
-                self.game_over = True
-                break
+    def show_registration(self):
+        self.registration_view.setup()
+        self.show_view(self.registration_view)
 
-        self.score += int(self.speed_multiplier)
+    def start_game(self, player_name, id):
+        self.game_view.start(player_name, id)
+        self.show_view(self.game_view)
 
-    def on_key_press(self, key, modifiers):
-        if key == arcade.key.LEFT:
-            self.left_pressed = True
-        elif key == arcade.key.RIGHT:
-            self.right_pressed = True
-        elif key == arcade.key.SPACE:
-            if self.game_over:
-                self.setup()
-        elif key == arcade.key.R:
-            self.setup()
-        elif key == arcade.key.ESCAPE:
-            self.close()
-            window = RegistrationWindow()
-            window.setup()
-            arcade.run()
-
-    def on_key_release(self, key, modifiers):
-        if key == arcade.key.LEFT:
-            self.left_pressed = False
-        elif key == arcade.key.RIGHT:
-            self.right_pressed = False
+    def start_replay(self, data):
+        self.game_view.start_replay(data)
+        self.show_view(self.game_view)
 
 
 def main():
-    window = RegistrationWindow()
-    window.setup()
+    parser = argparse.ArgumentParser(description=SCREEN_TITLE)
+    parser.add_argument("--replay", help="показать повтор из файла")
+    parser.add_argument("--replay-id", type=int, help="показать повтор рекорда из базы данных")
+    parser.add_argument("--profile", action="store_true",
+                        help="включить профайлер кадров и сохранить отчёт при выходе")
+    parser.add_argument("--cprofile", metavar="FILE", help="записать профиль cProfile в файл")
+    parser.add_argument("--preload", choices=PRELOAD_MODES, default=PRELOAD_MODE,
+                        help="загрузка ресурсов: в фоне, до первого кадра или по мере надобности")
+    parser.add_argument("--quality", choices=QUALITY_MODES, default=QUALITY_MODE,
+                        help="детализация: auto подстраивается под бюджет кадра, остальные закрепляют уровень")
+    parser.add_argument("--service", type=int, nargs="?", const=SERVICE_PORT, metavar="PORT",
+                        help="хранить рекорды через локальный сервис рекордов (score_service.py)")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    if args.service is not None:
+        database.use_service((SERVICE_HOST, args.service))
+
+    replay = None
+    if args.replay:
+        with open(args.replay, "rb") as file:
+            replay = file.read()
+    elif args.replay_id is not None:
+        replay = database.get_replay(args.replay_id)
+        if replay is None:
+            parser.error(f"у рекорда {args.replay_id} нет повтора")
+
+    quality.set_mode(args.quality)
+    if args.profile:
+        profiler.toggle()
+    if args.preload != "off":
+        tasks = [database.connect] if database.service is None else []
+        resources.start(tasks, background=args.preload == "background")
+    window = GameWindow()
+    if replay is not None:
+        window.start_replay(replay)
+    elif args.preload == "background":
+        window.show_loading()
+    else:
+        if args.preload == "sync":
+            window.preload(wait=True)
+        window.show_registration()
+    window.started = started
+    gc.collect()
+    gc.freeze()
+    if args.cprofile:
+        profiler.start_cprofile()
     arcade.run()
+    login_worker.close()
+    leaderboard_worker.close()
+    score_writer.close()
+    database.close()
+
+    if args.cprofile:
+        print(profiler.stop_cprofile(args.cprofile))
+    if profiler.sections and profiler.write_report(PROFILE_REPORT_PATH):
+        print(profiler.report())
+        print(f"Отчёт профайлера сохранён: {PROFILE_REPORT_PATH}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+import cProfile
+import io
+import math
+import pstats
+import time
+from collections import deque
+
+PROFILER_WINDOW = 300
+PROFILER_REFRESH = 0.5
+PROFILER_MIN_MS = 0.001
+PROFILER_BIN_GROWTH = 1.05
+PROFILER_BINS = 300
+PROFILE_REPORT_PATH = "profile_report.txt"
+
+SECTION_NAMES = {
+    "frame": "кадр",
+    "startup": "запуск",
+    "update": "обновление",
+    "input": "ввод",
+    "road": "дорога",
+    "traffic": "трафик",
+    "collision": "столкновения",
+    "db": "база данных",
+    "draw": "отрисовка",
+    "scenery": "сцена",
+    "cars": "машины",
+    "borders": "обочины",
+    "hud": "интерфейс",
+    "overlay": "оверлей"
+}
+
+
+class SectionStats:
+    def __init__(self):
+        self.recent = deque(maxlen=PROFILER_WINDOW)
+        self.histogram = [0] * (PROFILER_BINS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.recent.append(ms)
+        if ms > PROFILER_MIN_MS:
+            index = min(int(math.log(ms / PROFILER_MIN_MS, PROFILER_BIN_GROWTH)), PROFILER_BINS)
+        else:
+            index = 0
+        self.histogram[index] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def recent_percentiles(self, *levels):
+        ordered = sorted(self.recent)
+        if not ordered:
+            return [0.0] * len(levels)
+        return [ordered[min(int(len(ordered) * level / 100), len(ordered) - 1)] for level in levels]
+
+    def session_percentile(self, level):
+        target = self.count * level / 100
+        seen = 0
+        for i, count in enumerate(self.histogram):
+            seen += count
+            if seen >= target:
+                if i == PROFILER_BINS:
+                    return self.max
+                return min(PROFILER_MIN_MS * PROFILER_BIN_GROWTH ** (i + 1), self.max)
+        return self.max
+
+
+class FrameProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.sections = {}
+        self.last_frame = None
+        self.summary = []
+        self.refreshed = 0
+        self.cprofile = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.last_frame = None
+        self.refreshed = 0
+
+    def start(self):
+        if self.enabled:
+            return time.perf_counter()
+        return None
+
+    def stop(self, name, started):
+        if started is not None:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def record(self, name, ms):
+        stats = self.sections.get(name)
+        if stats is None:
+            stats = self.sections[name] = SectionStats()
+        stats.add(ms)
+
+    def frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            self.record("frame", (now - self.last_frame) * 1000)
+        self.last_frame = now
+
+    def overlay_lines(self):
+        now = time.perf_counter()
+        if now - self.refreshed < PROFILER_REFRESH:
+            return self.summary
+        self.refreshed = now
+
+        lines = []
+        frame = self.sections.get("frame")
+        if frame is not None and frame.recent:
+            p50, p95, p99 = frame.recent_percentiles(50, 95, 99)
+            fps = 1000 * len(frame.recent) / sum(frame.recent)
+            lines.append(f"FPS {fps:.0f} | p50 / p95 / p99")
+            lines.append(f"кадр: {p50:.1f} / {p95:.1f} / {p99:.1f} мс")
+        for name, label in SECTION_NAMES.items():
+            stats = self.sections.get(name)
+            if name in ("frame", "startup") or stats is None:
+                continue
+            p50, p95, p99 = stats.recent_percentiles(50, 95, 99)
+            lines.append(f"{label}: {p50:.3f} / {p95:.3f} / {p99:.3f} мс")
+        self.summary = lines
+        return lines
+
+    def report(self):
+        lines = ["Отчёт профайлера (мс)",
+                 f"{'секция':<14}{'вызовов':>9}{'среднее':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'макс':>9}"]
+        names = list(SECTION_NAMES) + sorted(set(self.sections) - set(SECTION_NAMES))
+        for name in names:
+            stats = self.sections.get(name)
+            if stats is None or not stats.count:
+                continue
+            lines.append(f"{SECTION_NAMES.get(name, name):<14}{stats.count:>9}{stats.total / stats.count:>10.3f}"
+                         f"{stats.session_percentile(50):>9.3f}{stats.session_percentile(95):>9.3f}"
+                         f"{stats.session_percentile(99):>9.3f}{stats.max:>9.3f}")
+        return "\n".join(lines)
+
+    def write_report(self, path=PROFILE_REPORT_PATH):
+        try:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(self.report() + "\n")
+            return True
+        except OSError as e:
+            print(f"Ошибка при сохранении отчёта профайлера: {e}")
+            return False
+
+    def start_cprofile(self):
+        self.cprofile = cProfile.Profile()
+        self.cprofile.enable()
+
+    def stop_cprofile(self, path, limit=20):
+        if self.cprofile is None:
+            return ""
+        self.cprofile.disable()
+        self.cprofile.dump_stats(path)
+        output = io.StringIO()
+        pstats.Stats(self.cprofile, stream=output).sort_stats("cumulative").print_stats(limit)
+        self.cprofile = None
+        return output.getvalue()
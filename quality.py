@@ -0,0 +1,93 @@
+from collections import deque
+
+QUALITY_LEVELS = ["low", "medium", "high"]
+QUALITY_MODE = "auto"
+QUALITY_MODES = ["auto"] + QUALITY_LEVELS
+QUALITY_FRAME_BUDGET = 1 / 60
+QUALITY_WINDOW = 60
+QUALITY_MISS_TOLERANCE = 1.2
+QUALITY_MISS_RATIO = 0.1
+QUALITY_HEADROOM = 0.5
+QUALITY_UPGRADE_DELAY = 3.0
+QUALITY_UPGRADE_DELAY_MAX = 60.0
+QUALITY_PROBATION = 2 * QUALITY_WINDOW
+QUALITY_SPIKE = 0.25
+
+QUALITY_NAMES = {
+    "low": "низкое",
+    "medium": "среднее",
+    "high": "высокое"
+}
+
+
+class QualityController:
+    def __init__(self, mode=QUALITY_MODE, budget=QUALITY_FRAME_BUDGET):
+        self.budget = budget
+        self.intervals = deque(maxlen=QUALITY_WINDOW)
+        self.work = deque(maxlen=QUALITY_WINDOW)
+        self.misses = 0
+        self.last_frame = None
+        self.changed_at = 0.0
+        self.probation = 0
+        self.upgrade_delay = QUALITY_UPGRADE_DELAY
+        self.set_mode(mode)
+
+    @property
+    def name(self):
+        return QUALITY_LEVELS[self.level]
+
+    def set_mode(self, mode):
+        self.mode = mode
+        self.pinned = mode != "auto"
+        self.level = QUALITY_LEVELS.index(mode) if self.pinned else len(QUALITY_LEVELS) - 1
+        self.reset()
+
+    def reset(self):
+        self.intervals.clear()
+        self.work.clear()
+        self.misses = 0
+        self.last_frame = None
+
+    def change(self, level, now):
+        if level < self.level and self.probation:
+            self.upgrade_delay = min(self.upgrade_delay * 2, QUALITY_UPGRADE_DELAY_MAX)
+        self.probation = QUALITY_PROBATION if level > self.level else 0
+        self.level = level
+        self.changed_at = now
+        self.reset()
+
+    def frame(self, now, work):
+        last_frame = self.last_frame
+        self.last_frame = now
+        if last_frame is None or self.pinned:
+            return False
+        interval = now - last_frame
+        if interval >= QUALITY_SPIKE:
+            return False
+
+        if len(self.intervals) == QUALITY_WINDOW and self.intervals[0] > self.budget * QUALITY_MISS_TOLERANCE:
+            self.misses -= 1
+        if interval > self.budget * QUALITY_MISS_TOLERANCE:
+            self.misses += 1
+        self.intervals.append(interval)
+        self.work.append(work)
+        if self.probation:
+            self.probation -= 1
+            if not self.probation:
+                self.upgrade_delay = QUALITY_UPGRADE_DELAY
+        if len(self.intervals) < QUALITY_WINDOW:
+            return False
+
+        if self.misses > QUALITY_WINDOW * QUALITY_MISS_RATIO and self.level > 0:
+            self.change(self.level - 1, now)
+            return True
+        if (not self.misses and self.level < len(QUALITY_LEVELS) - 1
+                and now - self.changed_at >= self.upgrade_delay
+                and max(self.work) < self.budget * QUALITY_HEADROOM):
+            self.change(self.level + 1, now)
+            return True
+        return False
+
+    def describe(self):
+        mode = "авто" if not self.pinned else "закреплено"
+        return f"качество: {QUALITY_NAMES[self.name]} ({mode})"
@@ -0,0 +1,176 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from database import DATABASE_PATH, Database
+from engine import Simulation
+
+REPLAY_MAGIC = b"TRR"
+REPLAY_VERSION = 2
+REPLAY_TRAFFIC = ["objects", "numpy", "scheduled"]
+REPLAY_BATCH_SIZE = 500
+
+
+def write_varint(buffer, value):
+    while value >= 0x80:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("Повтор обрезан")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode_replay(seed, score, input_runs, traffic):
+    if seed < 0:
+        raise ValueError("Сид повтора должен быть неотрицательным")
+    buffer = bytearray(REPLAY_MAGIC)
+    buffer.append(REPLAY_VERSION)
+    write_varint(buffer, REPLAY_TRAFFIC.index(traffic))
+    write_varint(buffer, seed)
+    write_varint(buffer, score)
+    write_varint(buffer, len(input_runs))
+    for state, count in input_runs:
+        write_varint(buffer, count << 2 | state)
+    return bytes(buffer)
+
+
+def decode_replay(data):
+    if len(data) <= len(REPLAY_MAGIC) or data[:len(REPLAY_MAGIC)] != REPLAY_MAGIC:
+        raise ValueError("Это не файл повтора")
+    offset = len(REPLAY_MAGIC)
+    version = data[offset]
+    if version not in (1, REPLAY_VERSION):
+        raise ValueError(f"Неизвестная версия повтора: {version}")
+    offset += 1
+
+    traffic = "objects"
+    if version >= 2:
+        traffic_index, offset = read_varint(data, offset)
+        if traffic_index >= len(REPLAY_TRAFFIC):
+            raise ValueError(f"Неизвестный трафик в повторе: {traffic_index}")
+        traffic = REPLAY_TRAFFIC[traffic_index]
+    seed, offset = read_varint(data, offset)
+    score, offset = read_varint(data, offset)
+    run_count, offset = read_varint(data, offset)
+    input_runs = []
+    for _ in range(run_count):
+        value, offset = read_varint(data, offset)
+        input_runs.append([value & 3, value >> 2])
+    return seed, score, input_runs, traffic
+
+
+def replay_inputs(input_runs):
+    for state, count in input_runs:
+        for _ in range(count):
+            yield state
+
+
+def apply_input(simulation, state):
+    simulation.left_pressed = bool(state & 1)
+    simulation.right_pressed = bool(state & 2)
+
+
+def play_replay(data):
+    seed, score, input_runs, traffic = decode_replay(data)
+    simulation = Simulation(seed, traffic=traffic)
+    for state in replay_inputs(input_runs):
+        apply_input(simulation, state)
+        simulation.tick()
+        if simulation.game_over:
+            break
+    return simulation
+
+
+def verify_replay(score_id, score, data):
+    try:
+        simulation = play_replay(data)
+    except ValueError as e:
+        return score_id, score, None, str(e)
+    if not simulation.game_over:
+        return score_id, score, simulation.score, "игра не закончилась"
+    if simulation.score != score:
+        return score_id, score, simulation.score, "счёт не совпадает"
+    return score_id, score, simulation.score, None
+
+
+def verify_database(database, workers):
+    checked = 0
+    failures = []
+    after_id = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            rows = database.get_replays(after_id, REPLAY_BATCH_SIZE)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            for score_id, score, replayed_score, error in executor.map(verify_replay, *zip(*rows), chunksize=16):
+                checked += 1
+                if error is not None:
+                    failures.append((score_id, score, replayed_score, error))
+    return checked, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Повторы игр Traffic Racer Lite")
+    parser.add_argument("--db", default=DATABASE_PATH, help="путь к базе данных")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="проиграть файл повтора без графики")
+    run_parser.add_argument("file")
+
+    export_parser = commands.add_parser("export", help="сохранить повтор рекорда в файл")
+    export_parser.add_argument("score_id", type=int)
+    export_parser.add_argument("file")
+
+    verify_parser = commands.add_parser("verify", help="проверить все сохранённые повторы")
+    verify_parser.add_argument("--workers", type=int, default=os.cpu_count(), help="количество процессов")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        with open(args.file, "rb") as file:
+            data = file.read()
+        seed, score, input_runs, traffic = decode_replay(data)
+        started = time.perf_counter()
+        simulation = play_replay(data)
+        elapsed = time.perf_counter() - started
+        print(f"Сид: {seed}, трафик: {traffic}, записанный счёт: {score}, размер: {len(data)} байт")
+        print(f"Счёт повтора: {simulation.score}, время: {simulation.game_time:.1f}с, "
+              f"тиков: {simulation.ticks} за {elapsed:.2f}с")
+        return
+
+    database = Database(args.db)
+    try:
+        if args.command == "export":
+            data = database.get_replay(args.score_id)
+            if data is None:
+                parser.error(f"у рекорда {args.score_id} нет повтора")
+            with open(args.file, "wb") as file:
+                file.write(data)
+            print(f"Повтор сохранён: {args.file} ({len(data)} байт)")
+        elif args.command == "verify":
+            started = time.perf_counter()
+            checked, failures = verify_database(database, args.workers)
+            for score_id, score, replayed_score, error in failures:
+                print(f"Рекорд {score_id}: записано {score}, повтор {replayed_score} - {error}")
+            print(f"Проверено повторов: {checked}, ошибок: {len(failures)} "
+                  f"за {time.perf_counter() - started:.1f}с")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
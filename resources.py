@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import deque
+
+from engine import ENEMY_HEIGHT, ENEMY_WIDTH, EnemyCar, PlayerCar
+from quality import QUALITY_LEVELS
+
+FONT_NAME = "Arial"
+PRELOAD_MODE = "background"
+PRELOAD_MODES = ["background", "sync", "off"]
+PRELOAD_FRAME_BUDGET = 0.004
+PRELOAD_CHUNK = 8
+PRELOAD_CHARACTERS = ("0123456789"
+                      "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+                      "абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
+                      " .,:;!?-+*/()|%\"'←→↑↓✓")
+
+
+def car_image(parts):
+    from PIL import Image, ImageDraw
+
+    width = max(abs(offset_x) * 2 + part_width for offset_x, _, part_width, _, _ in parts)
+    height = max(abs(offset_y) * 2 + part_height for _, offset_y, _, part_height, _ in parts)
+    image = Image.new("RGBA", (round(width), round(height)), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+
+    for offset_x, offset_y, part_width, part_height, color in parts:
+        left = round(width / 2 + offset_x - part_width / 2)
+        top = round(height / 2 - offset_y - part_height / 2)
+        draw.rectangle([left, top, left + round(part_width) - 1, top + round(part_height) - 1], fill=color)
+
+    return image
+
+
+class ResourceManager:
+    def __init__(self):
+        self.car_images = {}
+        self.car_textures = {}
+        self.shapes = {}
+        self.fonts = {}
+        self.font_styles = []
+        self.warm_queue = deque()
+        self.context = None
+        self.thread = None
+
+    def load_car_images(self):
+        player_parts = PlayerCar().detail_parts
+        enemy_parts = {color: EnemyCar.create_detail_parts(color, ENEMY_WIDTH, ENEMY_HEIGHT)
+                       for color in EnemyCar.colors}
+        images = {}
+        for level in QUALITY_LEVELS:
+            images[(level, "player", f"player_car_{level}")] = car_image(player_parts[level])
+            for color, parts in enemy_parts.items():
+                name = f"enemy_car_{color[0]}_{color[1]}_{color[2]}_{level}"
+                images[(level, color, name)] = car_image(parts[level])
+        self.car_images = images
+
+    def start(self, tasks=(), background=True):
+        tasks = [self.load_car_images] + list(tasks)
+        if background:
+            self.thread = threading.Thread(target=self.run, args=(tasks,), name="resource-loader", daemon=True)
+            self.thread.start()
+        else:
+            self.run(tasks)
+
+    def run(self, tasks):
+        for task in tasks:
+            try:
+                task()
+            except Exception as e:
+                print(f"Ошибка при загрузке ресурсов: {e}")
+
+    def loading(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def get_car_textures(self, level="high"):
+        import arcade
+
+        if not self.car_textures:
+            self.wait()
+            if not self.car_images:
+                self.load_car_images()
+            for (image_level, key, name), image in self.car_images.items():
+                self.car_textures.setdefault(image_level, {})[key] = arcade.Texture(image, hash=name)
+        return self.car_textures[level]
+
+    def bind(self, ctx):
+        if ctx is self.context:
+            return
+        if self.context is not None:
+            self.shapes = {}
+            self.fonts = {}
+            self.warm_queue = deque(task for task in self.warm_queue if task[0] != "font")
+            for font_name, size, bold in self.font_styles:
+                self.queue_font(font_name, size, bold, PRELOAD_CHARACTERS)
+        self.context = ctx
+
+    def shape_list(self, ctx, key, build):
+        self.bind(ctx)
+        shapes = self.shapes.get(key)
+        if shapes is None:
+            shapes = self.shapes[key] = build()
+        return shapes
+
+    def queue(self, task):
+        self.warm_queue.append(("task", task))
+
+    def queue_font(self, font_name, size, bold, characters):
+        for start in range(0, len(characters), PRELOAD_CHUNK):
+            self.warm_queue.append(("font", (font_name, size, bold, characters[start:start + PRELOAD_CHUNK])))
+
+    def queue_fonts(self, styles, font_name=FONT_NAME, characters=PRELOAD_CHARACTERS):
+        for size, bold in styles:
+            self.font_styles.append((font_name, size, bold))
+            self.queue_font(font_name, size, bold, characters)
+
+    def warm(self, ctx, budget=None):
+        import arcade
+
+        self.bind(ctx)
+        started = time.perf_counter()
+        while self.warm_queue:
+            kind, task = self.warm_queue.popleft()
+            if kind == "font":
+                font_name, size, bold, characters = task
+                self.fonts[(font_name, size, bold)] = arcade.Text(characters, 0, 0, font_size=size,
+                                                                  font_name=font_name, bold=bold)
+            else:
+                try:
+                    task()
+                except Exception as e:
+                    print(f"Ошибка при загрузке ресурсов: {e}")
+            if budget is not None and time.perf_counter() - started >= budget:
+                break
+        return not self.warm_queue
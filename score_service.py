@@ -0,0 +1,181 @@
+import argparse
+import asyncio
+import base64
+import json
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DATABASE_PATH, SERVICE_HOST, SERVICE_PORT, Database
+
+SERVICE_BATCH_SIZE = 512
+SERVICE_BATCH_DELAY = 0
+SERVICE_LOGIN_WORKERS = 2
+SERVICE_TOP_LIMIT = 100
+
+
+class ScoreService:
+    def __init__(self, database, batch_size=SERVICE_BATCH_SIZE, batch_delay=SERVICE_BATCH_DELAY):
+        self.database = database
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.writes = None
+        self.version = time.time_ns()
+        self.top_cache = {}
+        self.batches = 0
+        self.saved = 0
+        self.clients = set()
+        self.db_executor = ThreadPoolExecutor(1, thread_name_prefix="score-db")
+        self.login_executor = ThreadPoolExecutor(SERVICE_LOGIN_WORKERS, thread_name_prefix="score-login")
+
+    async def run_db(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.db_executor, function, *args)
+
+    async def write_scores(self):
+        while True:
+            batch = [await self.writes.get()]
+            await asyncio.sleep(self.batch_delay)
+            while len(batch) < self.batch_size and not self.writes.empty():
+                batch.append(self.writes.get_nowait())
+
+            saved = await self.run_db(self.database.save_records, [record for record, _ in batch])
+            if saved:
+                self.version += 1
+                self.top_cache = {}
+                self.batches += 1
+                self.saved += len(batch)
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(saved)
+
+    async def save(self, id, score, played_at=None, replay=None):
+        if played_at is None:
+            played_at = int(time.time())
+        if replay is not None:
+            replay = base64.b64decode(replay)
+        future = asyncio.get_running_loop().create_future()
+        self.writes.put_nowait(((id, score, played_at, replay), future))
+        return await future
+
+    async def top(self, limit=5):
+        limit = min(limit, SERVICE_TOP_LIMIT)
+        top = self.top_cache.get(limit)
+        if top is None:
+            version = self.version
+            top = await self.run_db(self.database.get_top_players, limit)
+            if version == self.version:
+                self.top_cache[limit] = top
+        return top
+
+    async def leaderboard(self, board="all", limit=5, after=None, now=None):
+        return await self.run_db(self.database.get_leaderboard, board, min(limit, SERVICE_TOP_LIMIT), after, now)
+
+    async def rank(self, id, board="all", now=None):
+        return await self.run_db(self.database.get_rank, id, board, now)
+
+    async def login(self, username, password):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.login_executor, self.database.register_or_login_user,
+                                          username, password)
+
+    async def replay(self, score_id):
+        replay = await self.run_db(self.database.get_replay, score_id)
+        return None if replay is None else base64.b64encode(replay).decode()
+
+    async def replays(self, after_id=0, limit=500):
+        rows = await self.run_db(self.database.get_replays, after_id, limit)
+        return [(score_id, score, base64.b64encode(replay).decode()) for score_id, score, replay in rows]
+
+    async def data_version(self):
+        return self.version
+
+    async def stats(self):
+        return {"saved": self.saved, "batches": self.batches, "clients": len(self.clients)}
+
+    async def handle(self, request):
+        handlers = {
+            "login": self.login,
+            "save": self.save,
+            "top": self.top,
+            "leaderboard": self.leaderboard,
+            "rank": self.rank,
+            "replay": self.replay,
+            "replays": self.replays,
+            "data_version": self.data_version,
+            "stats": self.stats
+        }
+        op = request.pop("op", None)
+        if op not in handlers:
+            raise ValueError(f"неизвестная операция: {op}")
+        return await handlers[op](**request)
+
+    async def serve_client(self, reader, writer):
+        self.clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = {"ok": True, "result": await self.handle(json.loads(line))}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    async def serve(self, host=SERVICE_HOST, port=SERVICE_PORT):
+        self.writes = asyncio.Queue()
+        writer_task = asyncio.create_task(self.write_scores())
+        server = await asyncio.start_server(self.serve_client, host, port)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in [signal.SIGINT, signal.SIGTERM]:
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        print(f"Сервис рекордов запущен на {host}:{port} (база {self.database.path})", flush=True)
+        async with server:
+            await stop.wait()
+            for writer in list(self.clients):
+                writer.close()
+        while not self.writes.empty():
+            await asyncio.sleep(self.batch_delay)
+        writer_task.cancel()
+        print(f"Сервис остановлен: сохранено {self.saved} рекордов за {self.batches} транзакций")
+
+    def close(self):
+        self.login_executor.shutdown()
+        self.db_executor.shutdown()
+        self.database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный сервис рекордов Traffic Racer Lite для нескольких клиентов")
+    parser.add_argument("--db", default=DATABASE_PATH, help="путь к базе данных")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help="порт на 127.0.0.1")
+    parser.add_argument("--batch-size", type=int, default=SERVICE_BATCH_SIZE,
+                        help="максимум рекордов в одной транзакции")
+    parser.add_argument("--batch-delay", type=float, default=SERVICE_BATCH_DELAY,
+                        help="сколько ждать следующих рекордов перед записью, секунд")
+    args = parser.parse_args()
+    if args.batch_size < 1 or args.batch_delay < 0:
+        parser.error("--batch-size должен быть больше нуля, --batch-delay не меньше нуля")
+
+    service = ScoreService(Database(args.db), args.batch_size, args.batch_delay)
+    try:
+        asyncio.run(service.serve(SERVICE_HOST, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
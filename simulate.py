@@ -0,0 +1,177 @@
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from engine import ENEMY_COUNT, ENEMY_WIDTH, TRAFFIC_BACKEND, TRAFFIC_BACKENDS, Simulation
+
+MAX_GAME_TIME = 600
+DRIVER_TURN_CHANCE = 0.02
+DODGE_DISTANCE = 250
+ALLOCATION_WARMUP_TICKS = 600
+ALLOCATION_TICKS = 6000
+ALLOCATION_LIMIT = 1.0
+ALLOCATION_PEAK_LIMITS = {"objects": (2048, 0), "scheduled": (2048, 0), "numpy": (12288, 96)}
+
+
+def idle_driver(simulation, rng):
+    pass
+
+
+def random_driver(simulation, rng):
+    if rng.random() < DRIVER_TURN_CHANCE:
+        direction = rng.choice(["left", "right", None])
+        simulation.left_pressed = direction == "left"
+        simulation.right_pressed = direction == "right"
+
+
+def dodge_driver(simulation, rng):
+    player = simulation.player
+    x = simulation.player_center_x
+    y = simulation.player_center_y - player.height
+    reach_x = (player.width + ENEMY_WIDTH) / 2
+    lane_width = simulation.road_width / 4
+    slots = [simulation.road_left + (i + 1) * lane_width / 2 for i in range(7)]
+    clearance = [min(simulation.traffic.clearance(slot, y, reach_x), DODGE_DISTANCE) for slot in slots]
+
+    current = min(range(7), key=lambda i: abs(slots[i] - x))
+    best = current
+    best_clearance = clearance[current]
+    for target in sorted(range(7), key=lambda i: (abs(i - current), rng.random())):
+        low, high = min(current, target), max(current, target)
+        path_clearance = min(clearance[low:high + 1])
+        if path_clearance > best_clearance:
+            best = target
+            best_clearance = path_clearance
+
+    simulation.left_pressed = x > slots[best]
+    simulation.right_pressed = x < slots[best]
+
+
+DRIVERS = {
+    "idle": idle_driver,
+    "random": random_driver,
+    "dodge": dodge_driver
+}
+
+
+def run_game(seed, driver="random", max_time=MAX_GAME_TIME, **rules):
+    simulation = Simulation(seed, **rules)
+    rng = random.Random(f"{seed}:driver")
+    drive = DRIVERS[driver]
+    max_ticks = int(max_time * simulation.tick_rate)
+
+    while not simulation.game_over and simulation.ticks < max_ticks:
+        drive(simulation, rng)
+        simulation.tick()
+
+    return {
+        "seed": seed,
+        "score": simulation.score,
+        "time": simulation.game_time,
+        "ticks": simulation.ticks,
+        "crashed": simulation.game_over
+    }
+
+
+def measure_step(step, count):
+    collections = 0
+
+    def count_collections(phase, info):
+        nonlocal collections
+        if phase == "start":
+            collections += 1
+
+    gc.collect()
+    gc.callbacks.append(count_collections)
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    total = largest = 0
+    try:
+        for _ in range(count):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            step()
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - before
+            largest = max(largest, peak - before)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        gc.callbacks.remove(count_collections)
+    return {
+        "retained": (current - start) / count,
+        "mean": total / count,
+        "peak": largest,
+        "collections": collections
+    }
+
+
+def measure_allocations(simulation, ticks=ALLOCATION_TICKS):
+    for _ in range(ALLOCATION_WARMUP_TICKS):
+        simulation.tick()
+
+    frame = 0
+
+    def draw_frame():
+        nonlocal frame
+        frame += 1
+        for x, y in simulation.traffic.positions(frame % 10 / 10):
+            pass
+
+    return {
+        "тик": measure_step(simulation.tick, ticks),
+        "кадр": measure_step(draw_frame, ticks)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный прогон игр Traffic Racer Lite без графики")
+    parser.add_argument("--games", type=int, default=100, help="количество игр")
+    parser.add_argument("--seed", type=int, default=0, help="сид первой игры")
+    parser.add_argument("--driver", choices=sorted(DRIVERS), default="random", help="стратегия водителя")
+    parser.add_argument("--max-time", type=float, default=MAX_GAME_TIME, help="ограничение длины игры, с")
+    parser.add_argument("--enemies", type=int, default=ENEMY_COUNT, help="количество машин трафика")
+    parser.add_argument("--traffic", choices=sorted(TRAFFIC_BACKENDS), default=TRAFFIC_BACKEND,
+                        help="реализация трафика: объекты или массивы numpy")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="проверить, что тики и кадры не накапливают и не выделяют лишнюю память, и выйти")
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error("--games должно быть больше нуля")
+
+    if args.trace_memory:
+        simulation = Simulation(args.seed, enemy_count=args.enemies, traffic=args.traffic)
+        base, per_car = ALLOCATION_PEAK_LIMITS[args.traffic]
+        peak_limit = base + per_car * args.enemies
+        failed = False
+        for name, stats in measure_allocations(simulation).items():
+            print(f"{name}: удержано {stats['retained']:.2f} байт за шаг, выделено внутри шага "
+                  f"в среднем {stats['mean']:.0f} и до {stats['peak']} байт, сборок мусора: {stats['collections']}")
+            if stats["retained"] > ALLOCATION_LIMIT or stats["peak"] > peak_limit or stats["collections"]:
+                print(f"{name}: превышен порог {ALLOCATION_LIMIT} байт удержания, {peak_limit} байт выделения "
+                      f"или запущена сборка мусора")
+                failed = True
+        if failed:
+            parser.exit(1)
+        return
+
+    started = time.perf_counter()
+    results = [run_game(seed, args.driver, args.max_time, enemy_count=args.enemies, traffic=args.traffic)
+               for seed in range(args.seed, args.seed + args.games)]
+    elapsed = time.perf_counter() - started
+
+    scores = [result["score"] for result in results]
+    times = [result["time"] for result in results]
+    ticks = sum(result["ticks"] for result in results)
+    crashes = sum(result["crashed"] for result in results)
+
+    print(f"Игр: {len(results)}, аварий: {crashes}")
+    print(f"Счёт: средний {sum(scores) / len(scores):.1f}, мин {min(scores)}, макс {max(scores)}")
+    print(f"Время в игре: среднее {sum(times) / len(times):.1f}с, макс {max(times):.1f}с")
+    print(f"Тиков: {ticks} за {elapsed:.2f}с ({ticks / elapsed:.0f} тиков/с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from engine import (ENEMY_COUNT, ENEMY_SPEED_MAX, ENEMY_SPEED_MIN, SPEED_INCREASE_AMOUNT,
+                    SPEED_INCREASE_INTERVAL, TRAFFIC_BACKEND, TRAFFIC_BACKENDS)
+from simulate import DRIVERS, MAX_GAME_TIME, run_game
+
+SWEEP_GAMES = 20
+SWEEP_DRIVER = "dodge"
+SWEEP_CSV_PATH = "sweep.csv"
+SWEEP_CHUNKS_PER_WORKER = 4
+
+PARAMETERS = [
+    ("speed_increase_interval", "--interval", float, SPEED_INCREASE_INTERVAL),
+    ("speed_increase_amount", "--amount", float, SPEED_INCREASE_AMOUNT),
+    ("enemy_speed_min", "--speed-min", float, ENEMY_SPEED_MIN),
+    ("enemy_speed_max", "--speed-max", float, ENEMY_SPEED_MAX),
+    ("enemy_count", "--enemies", int, ENEMY_COUNT)
+]
+
+
+def parse_values(text, cast):
+    return [cast(value) for value in text.split(",") if value.strip()]
+
+
+def describe(values):
+    deciles = statistics.quantiles(values, n=10, method="inclusive") if len(values) > 1 else values * 9
+    return {
+        "mean": statistics.fmean(values),
+        "min": min(values),
+        "p10": deciles[0],
+        "p50": deciles[4],
+        "p90": deciles[8],
+        "max": max(values)
+    }
+
+
+def run_games(rules, seeds, driver, max_time, traffic):
+    return [run_game(seed, driver, max_time, traffic=traffic, **rules) for seed in seeds]
+
+
+def summarize_point(rules, results):
+    scores = [result["score"] for result in results]
+    times = [result["time"] for result in results]
+    return {
+        "rules": rules,
+        "games": len(results),
+        "crash_rate": sum(result["crashed"] for result in results) / len(results),
+        "score": describe(scores),
+        "time": describe(times),
+        "ticks": sum(result["ticks"] for result in results)
+    }
+
+
+def build_grid(args):
+    names = [name for name, _, _, _ in PARAMETERS]
+    values = [getattr(args, name) for name in names]
+    grid = []
+    for combination in itertools.product(*values):
+        rules = dict(zip(names, combination))
+        if rules["enemy_speed_min"] <= rules["enemy_speed_max"]:
+            grid.append(rules)
+    return grid
+
+
+def split_seeds(seeds, points, workers):
+    size = -(-len(seeds) * points // (workers * SWEEP_CHUNKS_PER_WORKER))
+    size = max(1, min(size, len(seeds)))
+    return [seeds[i:i + size] for i in range(0, len(seeds), size)]
+
+
+def write_csv(path, points):
+    names = [name for name, _, _, _ in PARAMETERS]
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(names + ["games", "crash_rate"] +
+                        [f"{metric}_{stat}" for metric in ("score", "time")
+                         for stat in ("mean", "min", "p10", "p50", "p90", "max")])
+        for point in points:
+            writer.writerow([point["rules"][name] for name in names] + [point["games"], point["crash_rate"]] +
+                            [point[metric][stat] for metric in ("score", "time")
+                             for stat in ("mean", "min", "p10", "p50", "p90", "max")])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перебор параметров сложности на фоновых процессах")
+    for name, flag, cast, default in PARAMETERS:
+        parser.add_argument(flag, dest=name, type=lambda text, cast=cast: parse_values(text, cast),
+                            default=[default], help=f"значения {name} через запятую")
+    parser.add_argument("--games", type=int, default=SWEEP_GAMES, help="игр на каждую точку сетки")
+    parser.add_argument("--seed", type=int, default=0, help="сид первой игры каждой точки")
+    parser.add_argument("--driver", choices=sorted(DRIVERS), default=SWEEP_DRIVER, help="стратегия водителя")
+    parser.add_argument("--max-time", type=float, default=MAX_GAME_TIME, help="ограничение длины игры, с")
+    parser.add_argument("--traffic", choices=sorted(TRAFFIC_BACKENDS), default=TRAFFIC_BACKEND,
+                        help="реализация трафика")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="количество процессов")
+    parser.add_argument("--csv", default=SWEEP_CSV_PATH, help="файл CSV с результатами")
+    parser.add_argument("--json", help="файл JSON с результатами")
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error("--games должно быть больше нуля")
+
+    grid = build_grid(args)
+    if not grid:
+        parser.error("сетка параметров пуста")
+    seeds = range(args.seed, args.seed + args.games)
+
+    print(f"Точек сетки: {len(grid)}, игр: {len(grid) * args.games}, процессов: {args.workers}")
+    started = time.perf_counter()
+    chunks = split_seeds(seeds, len(grid), args.workers)
+    results = [[None] * len(chunks) for _ in grid]
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(run_games, rules, chunk, args.driver, args.max_time, args.traffic): (i, j)
+                   for i, rules in enumerate(grid) for j, chunk in enumerate(chunks)}
+        games = 0
+        for future in as_completed(futures):
+            i, j = futures[future]
+            results[i][j] = future.result()
+            games += len(results[i][j])
+            print(f"\r{games}/{len(grid) * args.games}", end="", flush=True)
+    points = [summarize_point(rules, [result for chunk in point for result in chunk])
+              for rules, point in zip(grid, results)]
+    elapsed = time.perf_counter() - started
+    print()
+
+    write_csv(args.csv, points)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(points, file, ensure_ascii=False, indent=2)
+
+    ticks = sum(point["ticks"] for point in points)
+    print(f"Готово за {elapsed:.1f}с ({ticks / elapsed:.0f} тиков/с), результаты: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import argparse
+import base64
+import contextlib
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+import time
+
+from database import DATABASE_PATH, Database
+
+TRANSFER_TABLES = ["users", "scores"]
+TRANSFER_FORMATS = ["jsonl", "csv"]
+TRANSFER_MODES = ["merge", "append"]
+TRANSFER_BATCH_SIZE = 10000
+
+FIELDS = {
+    "users": ["username", "password"],
+    "scores": ["username", "score", "played_at", "replay"]
+}
+
+EXPORT_QUERIES = {
+    "users": "SELECT username, password FROM users ORDER BY id",
+    "scores": """
+        SELECT u.username, s.score, s.played_at, s.replay
+        FROM scores s
+        JOIN users u ON u.id = s.user_id
+        ORDER BY s.id
+    """
+}
+
+IMPORT_QUERIES = {
+    ("users", "append"): "INSERT INTO users (username, password) VALUES (?1, ?2)",
+    ("users", "merge"): """
+        INSERT INTO users (username, password) VALUES (?1, ?2)
+        ON CONFLICT (username) DO NOTHING
+    """,
+    ("scores", "append"): """
+        INSERT INTO scores (user_id, score, played_at, replay)
+        SELECT id, ?2, ?3, ?4 FROM users WHERE username = ?1
+    """,
+    ("scores", "merge"): """
+        INSERT INTO scores (user_id, score, played_at, replay)
+        SELECT u.id, ?2, ?3, ?4 FROM users u
+        WHERE u.username = ?1 AND NOT EXISTS (
+            SELECT 1 FROM scores s WHERE s.user_id = u.id AND s.score = ?2 AND s.played_at = ?3
+        )
+    """
+}
+
+SELECT_SCORE_SCHEMA = """
+    SELECT type, name, tbl_name, sql FROM sqlite_master
+    WHERE tbl_name IN ('scores', 'best_scores', 'period_scores') AND type IN ('index', 'trigger')
+        AND sql IS NOT NULL
+"""
+
+
+def detect_format(path, format=None):
+    if format is not None:
+        return format
+    if path.lower().endswith(".csv"):
+        return "csv"
+    return "jsonl"
+
+
+@contextlib.contextmanager
+def open_stream(path, mode):
+    if path != "-":
+        with open(path, mode, encoding="utf-8", newline="") as file:
+            yield file
+        return
+
+    stream = sys.stdin if mode == "r" else sys.stdout
+    file = io.TextIOWrapper(stream.buffer, encoding="utf-8", newline="", write_through=True)
+    try:
+        yield file
+    finally:
+        try:
+            file.detach()
+        except (OSError, ValueError):
+            pass
+
+
+def encode_row(table, row):
+    row = list(row)
+    if table == "scores" and row[3] is not None:
+        row[3] = base64.b64encode(row[3]).decode()
+    return row
+
+
+def decode_row(table, record):
+    if table == "users":
+        username, password = record
+        if not username or not password:
+            raise ValueError("пустое имя или пароль")
+        return str(username), str(password)
+
+    username, score, played_at, replay = record
+    if not username:
+        raise ValueError("пустое имя")
+    played_at = int(played_at) if played_at not in (None, "") else int(time.time())
+    replay = base64.b64decode(replay) if replay else None
+    return str(username), int(score), played_at, replay
+
+
+def write_rows(file, format, table, rows):
+    fields = FIELDS[table]
+    count = 0
+    if format == "csv":
+        writer = csv.writer(file)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(["" if value is None else value for value in encode_row(table, row)])
+            count += 1
+    else:
+        for row in rows:
+            file.write(json.dumps(dict(zip(fields, encode_row(table, row))), ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def parse_line(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def read_chunks(file, format, table, size):
+    fields = FIELDS[table]
+    if format == "csv":
+        reader = csv.reader(file)
+        header = next(reader, [])
+        columns = [header.index(field) if field in header else None for field in fields]
+        for rows in iter(lambda: list(itertools.islice(reader, size)), []):
+            yield [[row[column] if column is not None and column < len(row) else None for column in columns]
+                   for row in rows]
+        return
+
+    for lines in iter(lambda: list(itertools.islice(file, size)), []):
+        lines = [line for line in lines if line.strip()]
+        try:
+            records = json.loads("[" + ",".join(lines) + "]")
+        except ValueError:
+            records = [parse_line(line) for line in lines]
+        yield [[record.get(field) for field in fields] if isinstance(record, dict) else None
+               for record in records]
+
+
+def export_table(database, table, file, format):
+    return write_rows(file, format, table, database.connect().execute(EXPORT_QUERIES[table]))
+
+
+def detach_score_schema(conn, keep=()):
+    schema = [row for row in conn.execute(SELECT_SCORE_SCHEMA).fetchall() if row[1] not in keep]
+    for kind, name, _, _ in schema:
+        conn.execute(f"DROP {kind.upper()} {name}")
+    return schema
+
+
+def restore_score_schema(conn, schema):
+    for statement in Database.REBUILD_RANKINGS:
+        conn.execute(statement)
+    for _, _, _, sql in sorted(schema, key=lambda row: row[0] == "trigger"):
+        conn.execute(sql)
+
+
+def import_table(database, table, file, format, mode, batch_size=TRANSFER_BATCH_SIZE):
+    conn = database.connect()
+    query = IMPORT_QUERIES[(table, mode)]
+    imported = skipped = 0
+    conn.execute("BEGIN")
+    try:
+        schema = []
+        if table == "scores":
+            keep = ["idx_scores_user"] if mode == "merge" else []
+            schema = detach_score_schema(conn, keep)
+
+        for chunk in read_chunks(file, format, table, batch_size):
+            batch = []
+            for record in chunk:
+                try:
+                    batch.append(decode_row(table, record))
+                except (ValueError, TypeError):
+                    skipped += 1
+            if not batch:
+                continue
+
+            cursor = conn.executemany(query, batch)
+            imported += cursor.rowcount
+            skipped += len(batch) - cursor.rowcount
+
+        if schema:
+            restore_score_schema(conn, schema)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return imported, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт и экспорт игроков и рекордов Traffic Racer Lite")
+    parser.add_argument("--db", default=DATABASE_PATH, help="путь к базе данных")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="выгрузить таблицу в файл JSONL или CSV")
+    export_parser.add_argument("table", choices=TRANSFER_TABLES)
+    export_parser.add_argument("file", help="файл или - для стандартного вывода")
+    export_parser.add_argument("--format", choices=TRANSFER_FORMATS, help="формат файла, по умолчанию по расширению")
+
+    import_parser = commands.add_parser("import", help="загрузить таблицу из файла JSONL или CSV")
+    import_parser.add_argument("table", choices=TRANSFER_TABLES)
+    import_parser.add_argument("file", help="файл или - для стандартного ввода")
+    import_parser.add_argument("--format", choices=TRANSFER_FORMATS, help="формат файла, по умолчанию по расширению")
+    import_parser.add_argument("--mode", choices=TRANSFER_MODES, default="merge",
+                               help="merge пропускает уже известных игроков и рекорды, append добавляет всё подряд")
+    import_parser.add_argument("--batch-size", type=int, default=TRANSFER_BATCH_SIZE,
+                               help="строк в одном пакете executemany")
+
+    args = parser.parse_args()
+    format = detect_format(args.file, args.format)
+    database = Database(args.db)
+    started = time.perf_counter()
+    try:
+        if args.command == "export":
+            with open_stream(args.file, "w") as file:
+                count = export_table(database, args.table, file, format)
+            print(f"Выгружено строк: {count} за {time.perf_counter() - started:.1f}с", file=sys.stderr)
+        else:
+            if args.batch_size < 1:
+                parser.error("--batch-size должен быть больше нуля")
+            with open_stream(args.file, "r") as file:
+                imported, skipped = import_table(database, args.table, file, format, args.mode, args.batch_size)
+            print(f"Загружено строк: {imported}, пропущено: {skipped} "
+                  f"за {time.perf_counter() - started:.1f}с")
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    except Exception as e:
+        print(f"Ошибка при переносе данных: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()